@@ -165,7 +165,7 @@ async def download_video_subtitles(video_id: int, db: Session = Depends(get_db))
         # Multiple subtitles - return as ZIP
         zip_buffer = io.BytesIO()
         
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as zip_file:
             for subtitle in subtitles:
                 filename = f"{safe_title}_{subtitle.language}.txt"
                 zip_file.writestr(filename, subtitle.content.encode('utf-8'))
@@ -199,7 +199,7 @@ async def download_channel_subtitles(channel_id: int, db: Session = Depends(get_
     
     # Create temporary file for the ZIP
     with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as tmp_file:
-        with zipfile.ZipFile(tmp_file, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        with zipfile.ZipFile(tmp_file, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as zip_file:
             for video in videos_with_subtitles:
                 subtitles = db.query(Subtitle).filter(Subtitle.video_id == video.id).all()
                 
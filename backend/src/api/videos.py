@@ -1,12 +1,13 @@
 from fastapi import APIRouter, HTTPException, Depends, Query
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 from datetime import datetime
 
 from db.models import Video, Channel, get_db
 from utils.queue_manager import (
     retry_failed_video, 
+    retry_failed_videos,
     get_queue_statistics, 
     get_channel_statistics,
     get_failed_videos
@@ -14,6 +15,9 @@ from utils.queue_manager import (
 
 router = APIRouter(prefix="/videos", tags=["videos"])
 
+# Batch retry ids are bound one variable each; stay well under SQLite's limit (999 on older builds)
+MAX_BATCH_RETRY_IDS = 500
+
 # Pydantic models
 class VideoOutput(BaseModel):
     id: int
@@ -45,6 +49,14 @@ class RetryResponse(BaseModel):
     video_id: int
     status: str
 
+class BatchRetryRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=MAX_BATCH_RETRY_IDS)
+
+class BatchRetryResponse(BaseModel):
+    message: str
+    retried: List[int]
+    skipped: List[int]
+
 @router.get("/", response_model=VideoListResponse)
 async def list_videos(
     status: Optional[str] = Query(None, description="Filter by status"),
@@ -119,6 +131,22 @@ async def retry_video(video_id: int, db: Session = Depends(get_db)):
         status="pending"
     )
 
+@router.post("/retry", response_model=BatchRetryResponse)
+async def retry_videos(request: BatchRetryRequest, db: Session = Depends(get_db)):
+    """Retry several failed videos at once; ids not in failed state are skipped"""
+    retried = retry_failed_videos(db, request.ids)
+    if retried is None:
+        raise HTTPException(status_code=500, detail="Failed to retry videos")
+    
+    retried_set = set(retried)
+    skipped = [video_id for video_id in dict.fromkeys(request.ids) if video_id not in retried_set]
+    
+    return BatchRetryResponse(
+        message=f"Retry initiated for {len(retried)} videos",
+        retried=retried,
+        skipped=skipped
+    )
+
 @router.get("/queue/stats", response_model=QueueStatsResponse)
 async def get_queue_stats(db: Session = Depends(get_db)):
     """Get overall queue statistics"""
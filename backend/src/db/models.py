@@ -1,7 +1,9 @@
-from sqlalchemy import create_engine, Column, Integer, String, ForeignKey, DateTime, Text, CheckConstraint, Index
+from sqlalchemy import create_engine, event, Column, Integer, String, ForeignKey, DateTime, Text, CheckConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session, relationship
+from sqlalchemy.orm import sessionmaker, scoped_session, Session, relationship
+from sqlalchemy.pool import QueuePool
 from datetime import datetime
+import logging
 import sqlite3
 import os
 
@@ -101,11 +103,36 @@ engine = create_engine(
         "check_same_thread": False,
         "timeout": 20,  # 20 second timeout for database locks
     },
+    # File-backed SQLite defaults to NullPool (a new connection per checkout);
+    # keep a bounded set of connections open and reuse them instead
+    poolclass=QueuePool,
+    pool_size=8,
+    max_overflow=4,
     pool_pre_ping=True,
     pool_recycle=300
 )
+
+@event.listens_for(engine, "connect")
+def _configure_sqlite_connection(dbapi_connection, connection_record):
+    """Per-connection SQLite settings for the append-heavy workload.
+    
+    WAL lets the dashboard read while a worker writes, and with synchronous=NORMAL
+    a commit no longer waits on an fsync (the WAL is still synced at checkpoints).
+    Lock waits are already bounded by the driver's 20 second timeout above.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-16384")  # 16 MiB page cache per pooled connection
+    cursor.close()
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Thread-local sessions for callers that run many short units of work per thread;
+# call ScopedSession.remove() when the thread is done
+ScopedSession = scoped_session(SessionLocal)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -134,6 +161,12 @@ def init_db():
                 db.commit()
         finally:
             db.close()
+    
+    # WAL needs shared-memory support from the filesystem; SQLite silently keeps the old mode without it
+    with engine.connect() as conn:
+        journal_mode = conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+    if journal_mode != 'wal':
+        logging.warning(f"SQLite WAL mode unavailable for {DATABASE_PATH}; journal_mode is {journal_mode}")
 
 def _execute_migration_file():
     """Execute the initial migration SQL file"""
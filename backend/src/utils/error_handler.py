@@ -5,7 +5,13 @@ Implements centralized logging, recovery strategy, and automatic requeue logic
 according to TRD Section 1.7 Error Handling.
 """
 
+import atexit
 import logging
+import os
+import queue
+import re
+import threading
+import time
 import traceback
 from datetime import datetime
 from typing import Optional, Union
@@ -65,10 +71,146 @@ def log_to_db(db: Session, video_id: Optional[int], level: str, message: str) ->
         return False
 
 
+# Minimum level written to the logs table (INFO, WARN or ERROR); console output
+# still follows the logging configuration
+_DB_LEVEL_RANK = {'INFO': 0, 'WARN': 1, 'ERROR': 2}
+# The logs.level CHECK constraint only admits the three levels above; map the
+# logging module's spellings onto them
+_DB_LEVEL_ALIASES = {'WARNING': 'WARN', 'CRITICAL': 'ERROR', 'FATAL': 'ERROR'}
+DB_LOG_LEVEL = os.getenv('DB_LOG_LEVEL', 'INFO').upper()
+_DB_MIN_RANK = _DB_LEVEL_RANK.get(_DB_LEVEL_ALIASES.get(DB_LOG_LEVEL, DB_LOG_LEVEL), 0)
+
+# DB_LOG_TRACEBACKS=0 stores only the exception message for unexpected errors
+DB_LOG_TRACEBACKS = os.getenv('DB_LOG_TRACEBACKS', '1') != '0'
+
+# Database log entries are queued and written in batches by a background thread,
+# so callers never wait on a session, an INSERT and a commit per message
+LOG_QUEUE_SIZE = 10000
+LOG_BATCH_SIZE = 500
+LOG_FLUSH_INTERVAL = 0.1  # seconds a batch may wait to fill up
+
+_log_queue: "queue.Queue[dict]" = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+_flusher_lock = threading.Lock()
+_flusher_thread: Optional[threading.Thread] = None
+_dropped_logs = 0
+
+
+class LazyTraceback:
+    """Exception log text whose traceback is formatted only when the row is written"""
+    __slots__ = ('exc',)
+    
+    def __init__(self, exc: Exception):
+        self.exc = exc
+    
+    def __str__(self) -> str:
+        tb = ''.join(traceback.format_exception(type(self.exc), self.exc, self.exc.__traceback__))
+        return f"Exception: {str(self.exc)}\nTraceback: {tb}"
+
+
+def _truncate_message(message) -> str:
+    """Truncate message to prevent DB bloat (keep the last 4000 chars)"""
+    message = str(message)
+    return message[-4000:] if len(message) > 4000 else message
+
+
+def _write_log_batch(rows: list):
+    """Insert a batch of queued log rows in one transaction, row by row if that fails"""
+    for row in rows:
+        if isinstance(row['message'], LazyTraceback):
+            row['message'] = _truncate_message(row['message'])
+    
+    db = None
+    try:
+        db = get_db_session()
+        try:
+            db.bulk_insert_mappings(Log, rows)
+            db.commit()
+            return
+        except Exception as e:
+            db.rollback()
+            if len(rows) == 1:
+                raise
+            logging.warning(f"Batch insert of {len(rows)} log entries failed, retrying one by one: {e}")
+        
+        # One bad row rolls back the whole batch; insert the rows singly so only it is lost
+        for row in rows:
+            try:
+                db.bulk_insert_mappings(Log, [row])
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                logging.error(f"Failed to log entry to database: {e}")
+    except Exception as e:
+        # Fallback to console logging if DB logging fails
+        if db is not None:
+            db.rollback()
+        logging.error(f"Failed to log {len(rows)} entries to database: {e}")
+    finally:
+        if db is not None:
+            db.close()
+
+
+def _flush_loop():
+    """Drain the log queue: up to LOG_BATCH_SIZE rows or LOG_FLUSH_INTERVAL per commit"""
+    while True:
+        batch = [_log_queue.get()]
+        deadline = time.monotonic() + LOG_FLUSH_INTERVAL
+        while len(batch) < LOG_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_log_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        
+        try:
+            _write_log_batch(batch)
+        except Exception:
+            # Never let one bad batch end the thread; later log() calls would queue forever
+            logging.exception(f"Database log flusher dropped {len(batch)} entries")
+        finally:
+            for _ in batch:
+                _log_queue.task_done()
+
+
+def _ensure_log_flusher():
+    """Start the flusher thread on first use"""
+    global _flusher_thread
+    if _flusher_thread is not None:
+        return
+    with _flusher_lock:
+        if _flusher_thread is None:
+            thread = threading.Thread(target=_flush_loop, name="db-log-flusher", daemon=True)
+            thread.start()
+            _flusher_thread = thread
+
+
+def flush_logs(timeout: Optional[float] = None) -> bool:
+    """
+    Block until every queued log entry has been written to the database.
+    
+    Args:
+        timeout: Maximum seconds to wait (None waits indefinitely)
+        
+    Returns:
+        bool: True if the queue drained, False if the timeout expired first
+    """
+    with _log_queue.all_tasks_done:
+        return _log_queue.all_tasks_done.wait_for(lambda: not _log_queue.unfinished_tasks, timeout)
+
+
+# Daemon threads are still alive while atexit handlers run, so queued entries get written
+atexit.register(flush_logs, 5.0)
+
+
 def log(level: str, message: str, video_id: Optional[int] = None):
     """
     Centralized logging function that logs to both console and database.
     
+    The database write is queued and committed in batches; call flush_logs()
+    when the entries must be visible before reading the logs table.
+    
     Args:
         level: Log level (INFO, WARN, ERROR)
         message: Log message
@@ -81,16 +223,35 @@ def log(level: str, message: str, video_id: Optional[int] = None):
     else:
         logging.log(log_level, message)
     
-    # Try to log to database
+    _queue_db_log(level, _truncate_message(message), video_id)
+
+
+def _queue_db_log(level: str, message: Union[str, LazyTraceback], video_id: Optional[int]):
+    """Queue a log row for the database; never block the caller if the writer falls behind"""
+    global _dropped_logs
+    
+    level = level.upper()
+    level = _DB_LEVEL_ALIASES.get(level, level)
+    rank = _DB_LEVEL_RANK.get(level)
+    if rank is None or rank < _DB_MIN_RANK:
+        # DEBUG and unknown levels would fail the CHECK constraint; console only
+        return
+    
+    entry = {
+        'video_id': video_id,
+        'level': level,
+        'message': message,
+        'timestamp': datetime.utcnow()
+    }
+    
+    _ensure_log_flusher()
     try:
-        db = get_db_session()
-        try:
-            log_to_db(db, video_id, level, message)
-        finally:
-            db.close()
-    except Exception as e:
-        # If DB logging fails, only log to console (avoid infinite recursion)
-        logging.error(f"Database logging failed, using console only: {e}")
+        _log_queue.put_nowait(entry)
+    except queue.Full:
+        _dropped_logs += 1
+        # Report the first drop and then every 1000th, not every message
+        if _dropped_logs % 1000 == 1:
+            logging.error(f"Database log queue full, dropped {_dropped_logs} entries so far")
 
 
 def log_exception(video_id: Optional[int], exc: Exception):
@@ -101,14 +262,15 @@ def log_exception(video_id: Optional[int], exc: Exception):
         video_id: Video ID if applicable
         exc: Exception object
     """
-    # Get full traceback
-    tb = ''.join(traceback.format_exception(type(exc), exc, exc.__traceback__))
-    
-    # Truncate to prevent unbounded size (keep last 4000 chars)
-    trimmed_tb = tb[-4000:] if len(tb) > 4000 else tb
+    # Console gets the one-line summary (formatted only if a handler takes it); the
+    # traceback is formatted once, by the database writer, keeping the last 4000 chars
+    if video_id:
+        logging.error("Video %s: Exception: %s", video_id, exc)
+    else:
+        logging.error("Exception: %s", exc)
     
-    # Log the exception
-    log('ERROR', f"Exception: {str(exc)}\nTraceback: {trimmed_tb}", video_id)
+    message = LazyTraceback(exc) if DB_LOG_TRACEBACKS else _truncate_message(f"Exception: {str(exc)}")
+    _queue_db_log('ERROR', message, video_id)
 
 
 def schedule_retry(db: Session, video_id: int, error: Exception):
@@ -329,6 +491,48 @@ def startup_recovery():
 
 
 # Exception classification helpers
+
+# Permanent errors (don't retry)
+PERMANENT_ERROR_INDICATORS = (
+    'private video',
+    'unavailable',
+    'deleted',
+    'no such file',
+    'age restricted',
+    'no subtitles available',
+    'no native subtitles',
+    'subtitles not available',
+    'invalid url',
+    'unknown video id',
+    'video not found'
+)
+
+# Server-side outages whose text also contains 'unavailable'; checked before the
+# permanent indicators so they are retried
+TRANSIENT_OVERRIDE_INDICATORS = (
+    'service unavailable',
+    'temporarily unavailable'
+)
+
+# Transient errors (should retry)
+TRANSIENT_ERROR_INDICATORS = (
+    'timeout',
+    'connection',
+    'network',
+    'temporary',
+    '503',
+    '502', 
+    '500',
+    'rate limit',
+    'quota exceeded'
+)
+
+# One case-insensitive scan per message instead of a substring test per indicator
+_TRANSIENT_OVERRIDE_RE = re.compile('|'.join(map(re.escape, TRANSIENT_OVERRIDE_INDICATORS)), re.IGNORECASE)
+_PERMANENT_ERROR_RE = re.compile('|'.join(map(re.escape, PERMANENT_ERROR_INDICATORS)), re.IGNORECASE)
+_TRANSIENT_ERROR_RE = re.compile('|'.join(map(re.escape, TRANSIENT_ERROR_INDICATORS)), re.IGNORECASE)
+
+
 def classify_yt_dlp_error(error_message: str) -> type:
     """
     Classify yt-dlp errors as transient or permanent.
@@ -339,42 +543,15 @@ def classify_yt_dlp_error(error_message: str) -> type:
     Returns:
         Exception class (TransientError or PermanentError)
     """
-    error_lower = error_message.lower()
-    
-    # Permanent errors (don't retry)
-    permanent_indicators = [
-        'private video',
-        'unavailable',
-        'deleted',
-        'no such file',
-        'age restricted',
-        'no subtitles available',
-        'no native subtitles',
-        'subtitles not available',
-        'invalid url',
-        'unknown video id'
-    ]
-    
-    # Transient errors (should retry)
-    transient_indicators = [
-        'timeout',
-        'connection',
-        'network',
-        'temporary',
-        '503',
-        '502', 
-        '500',
-        'rate limit',
-        'quota exceeded'
-    ]
+    if _TRANSIENT_OVERRIDE_RE.search(error_message):
+        return TransientError
     
-    for indicator in permanent_indicators:
-        if indicator in error_lower:
-            return PermanentError
+    # Permanent indicators win over the generic transient ones
+    if _PERMANENT_ERROR_RE.search(error_message):
+        return PermanentError
     
-    for indicator in transient_indicators:
-        if indicator in error_lower:
-            return TransientError
+    if _TRANSIENT_ERROR_RE.search(error_message):
+        return TransientError
     
     # Default to transient (retry) for unknown errors
     return TransientError
@@ -7,54 +7,71 @@ and recovery according to TRD Section 1.2.
 
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError, OperationalError
-from sqlalchemy import text, func
+from sqlalchemy import text, func, bindparam, DateTime
 from datetime import datetime, timedelta
-from typing import Optional, Dict, List, Tuple
+from typing import Optional, Dict, List, NamedTuple, Tuple
 import logging
 import time
 
-from db.models import Video, Subtitle, Log, Setting
+from db.models import Subtitle, Log, Setting
 
 
 def claim_next_video(db: Session) -> Optional[int]:
     """
     Atomically claim the next pending video for processing.
     
-    Uses SQLite atomic UPDATE to ensure only one worker can claim a video.
+    Single-row form of claim_next_videos, so the pick and the claim happen in
+    one UPDATE and a concurrent worker can never take the same row.
     
     Returns:
         video_id (int) if a video was claimed, None if queue is empty
     """
+    video_ids = claim_next_videos(db, 1)
+    return video_ids[0] if video_ids else None
+
+
+def claim_next_videos(db: Session, batch_size: int) -> List[int]:
+    """
+    Atomically claim up to batch_size pending videos in one round-trip.
+    
+    SQLite has no SELECT ... FOR UPDATE SKIP LOCKED; a single UPDATE over a
+    LIMITed sub-select gives the same guarantee because the statement holds
+    the write lock for its whole run, so concurrent callers never share ids.
+    
+    Returns:
+        List of claimed video ids in queue order (empty if the queue is empty)
+    """
     try:
-        # For SQLite compatibility, use a simpler approach
-        # First, get the next pending video
-        video = db.query(Video).filter(Video.status == 'pending').order_by(Video.id).first()
-        
-        if not video:
-            logging.debug("No pending videos available")
-            return None
-        
-        # Try to update the specific video to processing
         result = db.execute(text("""
-            UPDATE videos 
+            UPDATE videos
             SET status = 'processing'
-            WHERE id = :video_id AND status = 'pending'
-        """), {'video_id': video.id})
+            WHERE id IN (
+                SELECT id FROM videos
+                WHERE status = 'pending'
+                ORDER BY id
+                LIMIT :batch_size
+            )
+            RETURNING id
+        """), {'batch_size': batch_size})
+        video_ids = sorted(row[0] for row in result.fetchall())
+        db.commit()
         
-        if result.rowcount == 1:
-            db.commit()
-            logging.info(f"Claimed video {video.id} for processing")
-            return video.id
+        if video_ids:
+            logging.info(f"Claimed {len(video_ids)} videos for processing: {video_ids}")
         else:
-            # Another worker claimed it first
-            db.rollback()
-            logging.debug(f"Video {video.id} was claimed by another worker")
-            return None
-            
+            logging.debug("No pending videos available")
+        return video_ids
+        
     except Exception as e:
         db.rollback()
-        logging.error(f"Failed to claim video: {e}")
-        return None
+        logging.error(f"Failed to claim videos: {e}")
+        return []
+
+
+class ReleasedVideo(NamedTuple):
+    """A video's state as returned by the UPDATE in release_video_state"""
+    status: str
+    attempts: int
 
 
 def release_video(db: Session, video_id: int, status: str, error_message: str = None) -> bool:
@@ -70,27 +87,70 @@ def release_video(db: Session, video_id: int, status: str, error_message: str =
     Returns:
         bool: True if successful, False otherwise
     """
+    return release_video_state(db, video_id, status, error_message) is not None
+
+
+def release_video_state(db: Session, video_id: int, status: str, error_message: str = None) -> Optional[ReleasedVideo]:
+    """
+    Release a video like release_video and return the row's new state.
+    
+    Each transition is a single UPDATE ... RETURNING, so the new state comes
+    back with the write and callers don't need a verify query. A failed video
+    that still has retries left comes back with status 'pending'.
+    
+    Returns:
+        ReleasedVideo(status, attempts), or None if the status is invalid, the
+        video is missing or the update failed
+    """
     try:
-        video = db.query(Video).filter(Video.id == video_id).first()
-        if not video:
-            logging.error(f"Video {video_id} not found")
-            return False
+        if status == 'failed':
+            # Get retry settings
+            settings = db.query(Setting).filter(Setting.id == 1).first()
+            max_retries = settings.max_retries if settings else 3
+            
+            # Requeue for retry while attempts remain; SET expressions see the old row
+            result = db.execute(text("""
+                UPDATE videos
+                SET attempts = attempts + 1,
+                    last_error = :error_message,
+                    status = CASE WHEN attempts + 1 < :max_retries THEN 'pending' ELSE 'failed' END
+                WHERE id = :video_id
+                RETURNING status, attempts
+            """), {'video_id': video_id, 'error_message': error_message, 'max_retries': max_retries})
         
-        # Get retry settings
-        settings = db.query(Setting).filter(Setting.id == 1).first()
-        max_retries = settings.max_retries if settings else 3
+        elif status == 'completed':
+            result = db.execute(text("""
+                UPDATE videos
+                SET status = 'completed', completed_at = :completed_at, last_error = NULL
+                WHERE id = :video_id
+                RETURNING status, attempts
+            """).bindparams(bindparam('completed_at', type_=DateTime)),
+                {'video_id': video_id, 'completed_at': datetime.utcnow()})
+            
+        elif status == 'pending':
+            result = db.execute(text("""
+                UPDATE videos
+                SET status = 'pending'
+                WHERE id = :video_id
+                RETURNING status, attempts
+            """), {'video_id': video_id})
+            
+        else:
+            logging.error(f"Invalid status '{status}' for video {video_id}")
+            return None
+        
+        row = result.fetchone()
+        if row is None:
+            db.rollback()
+            logging.error(f"Video {video_id} not found")
+            return None
+        new_status, attempts = row
         
         if status == 'failed':
-            video.attempts += 1
-            video.last_error = error_message
-            
-            # Check if we should retry or mark as permanently failed
-            if video.attempts < max_retries:
-                video.status = 'pending'  # Requeue for retry
-                logging.info(f"Video {video_id} failed, requeuing (attempt {video.attempts}/{max_retries})")
+            if new_status == 'pending':
+                logging.info(f"Video {video_id} failed, requeuing (attempt {attempts}/{max_retries})")
             else:
-                video.status = 'failed'
-                logging.warning(f"Video {video_id} permanently failed after {video.attempts} attempts")
+                logging.warning(f"Video {video_id} permanently failed after {attempts} attempts")
                 
                 # Log the failure
                 log_entry = Log(
@@ -100,28 +160,18 @@ def release_video(db: Session, video_id: int, status: str, error_message: str =
                     timestamp=datetime.utcnow()
                 )
                 db.add(log_entry)
-        
         elif status == 'completed':
-            video.status = 'completed'
-            video.completed_at = datetime.utcnow()
-            video.last_error = None
             logging.info(f"Video {video_id} completed successfully")
-            
-        elif status == 'pending':
-            video.status = 'pending'
-            logging.info(f"Video {video_id} reset to pending")
-            
         else:
-            logging.error(f"Invalid status '{status}' for video {video_id}")
-            return False
+            logging.info(f"Video {video_id} reset to pending")
         
         db.commit()
-        return True
+        return ReleasedVideo(new_status, attempts)
         
     except Exception as e:
         db.rollback()
         logging.error(f"Failed to release video {video_id}: {e}")
-        return False
+        return None
 
 
 def reset_processing_videos(db: Session) -> int:
@@ -140,7 +190,6 @@ def reset_processing_videos(db: Session) -> int:
         """))
         
         reset_count = result.rowcount
-        db.commit()
         
         if reset_count > 0:
             logging.info(f"Reset {reset_count} processing videos to pending on startup")
@@ -153,8 +202,9 @@ def reset_processing_videos(db: Session) -> int:
                 timestamp=datetime.utcnow()
             )
             db.add(log_entry)
-            db.commit()
         
+        # The reset and its log entry land in one transaction
+        db.commit()
         return reset_count
         
     except Exception as e:
@@ -283,6 +333,40 @@ def get_channel_statistics(db: Session, channel_id: int) -> Dict[str, int]:
         return {'pending': 0, 'processing': 0, 'completed': 0, 'failed': 0, 'total': 0}
 
 
+def get_combined_statistics(db: Session, channel_id: int) -> Tuple[Dict[str, int], Dict[str, int]]:
+    """
+    Get overall and per-channel queue statistics from a single aggregation.
+    
+    Args:
+        channel_id: ID of the channel
+        
+    Returns:
+        tuple: (overall counts by status, channel counts by status)
+    """
+    overall = {'pending': 0, 'processing': 0, 'completed': 0, 'failed': 0, 'total': 0}
+    channel = dict(overall)
+    try:
+        result = db.execute(text("""
+            SELECT status,
+                   COUNT(*) as count,
+                   SUM(CASE WHEN channel_id = :channel_id THEN 1 ELSE 0 END) as channel_count
+            FROM videos
+            GROUP BY status
+        """), {'channel_id': channel_id}).fetchall()
+        
+        for status, count, channel_count in result:
+            overall[status] = count
+            overall['total'] += count
+            channel[status] = channel_count
+            channel['total'] += channel_count
+        
+        return overall, channel
+        
+    except Exception as e:
+        logging.error(f"Failed to get combined statistics for channel {channel_id}: {e}")
+        return {key: 0 for key in overall}, {key: 0 for key in channel}
+
+
 def retry_failed_video(db: Session, video_id: int) -> bool:
     """
     Manually retry a failed video by resetting its status and attempts.
@@ -294,22 +378,19 @@ def retry_failed_video(db: Session, video_id: int) -> bool:
         bool: True if successful, False otherwise
     """
     try:
-        video = db.query(Video).filter(Video.id == video_id).first()
-        if not video:
-            logging.error(f"Video {video_id} not found")
-            return False
+        # Reset for retry; the status guard makes the check and the reset one statement
+        result = db.execute(text("""
+            UPDATE videos
+            SET status = 'pending', attempts = 0, last_error = NULL
+            WHERE id = :video_id AND status = 'failed'
+            RETURNING id
+        """), {'video_id': video_id})
         
-        if video.status != 'failed':
-            logging.warning(f"Video {video_id} is not in failed state (current: {video.status})")
+        if result.fetchone() is None:
+            db.rollback()
+            logging.warning(f"Video {video_id} not found or not in failed state")
             return False
         
-        # Reset for retry
-        video.status = 'pending'
-        video.attempts = 0
-        video.last_error = None
-        
-        db.commit()
-        
         logging.info(f"Manually reset video {video_id} for retry")
         
         # Log the manual retry
@@ -330,6 +411,52 @@ def retry_failed_video(db: Session, video_id: int) -> bool:
         return False
 
 
+def retry_failed_videos(db: Session, video_ids: List[int]) -> Optional[List[int]]:
+    """
+    Manually retry several failed videos in one statement.
+    
+    Ids that don't exist or aren't in the failed state are left untouched.
+    
+    Args:
+        video_ids: IDs of the videos to retry
+        
+    Returns:
+        List[int]: IDs that were reset to pending, or None on error
+    """
+    if not video_ids:
+        return []
+    
+    try:
+        result = db.execute(
+            text("""
+                UPDATE videos
+                SET status = 'pending', attempts = 0, last_error = NULL
+                WHERE id IN :video_ids AND status = 'failed'
+                RETURNING id
+            """).bindparams(bindparam('video_ids', expanding=True)),
+            {'video_ids': list(video_ids)}
+        )
+        retried_ids = sorted(video_id for (video_id,) in result)
+        
+        if retried_ids:
+            logging.info(f"Manually reset {len(retried_ids)} videos for retry")
+            
+            # Log the manual retries
+            now = datetime.utcnow()
+            db.bulk_insert_mappings(Log, [
+                {'video_id': video_id, 'level': 'INFO', 'message': "Manual retry initiated", 'timestamp': now}
+                for video_id in retried_ids
+            ])
+        db.commit()
+        
+        return retried_ids
+        
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Failed to retry videos {list(video_ids)}: {e}")
+        return None
+
+
 def get_failed_videos(db: Session, limit: int = 100) -> List[Dict]:
     """
     Get list of failed videos with their error information.
@@ -13,6 +13,8 @@ import threading
 import signal
 import logging
 import math
+import queue
+import random
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -43,7 +45,8 @@ STOP_EVENT = threading.Event()
 class SubtitleWorker:
     """Individual worker for processing video subtitles with enhanced error handling and backoff"""
     
-    def __init__(self, worker_id: int):
+    def __init__(self, worker_id: int, progress: Optional[threading.Condition] = None,
+                 rng: Optional[random.Random] = None, completions: Optional[queue.SimpleQueue] = None):
         self.worker_id = worker_id
         self.running = True
         self.processed_count = 0
@@ -52,18 +55,43 @@ class SubtitleWorker:
         self.started_at = datetime.utcnow()
         self.last_activity = datetime.utcnow()
         
+        # Set once the worker enters its main loop
+        self.ready = threading.Event()
+        # Notified whenever a video finishes (successfully or not)
+        self.progress = progress
+        # Source of backoff jitter; pass a seeded Random for reproducible delays
+        self.rng = rng or random.Random()
+        # Receives (worker_id, video_id, done_ts_ns) for every completed video
+        self.completions = completions
+        
     def stop(self):
         """Stop the worker gracefully"""
         self.running = False
         log('INFO', f"Worker {self.worker_id} stopping...")
     
     def get_retry_delay(self, attempts: int, backoff_factor: float) -> float:
-        """Calculate exponential backoff delay"""
-        return min(backoff_factor ** attempts, 300)  # Cap at 5 minutes
+        """Calculate exponential backoff delay with ±50% jitter so workers don't retry in lockstep"""
+        delay = min(backoff_factor ** (attempts + 1), 300)
+        return min(delay * (1 + self.rng.uniform(-0.5, 0.5)), 300)  # Cap at 5 minutes
+    
+    def classify_error(self, error: Exception) -> bool:
+        """Return True if the error is transient and the video should be retried"""
+        if isinstance(error, PermanentError):
+            return False
+        if isinstance(error, TransientError):
+            return True
+        return classify_yt_dlp_error(str(error)) is TransientError
+    
+    def _notify_progress(self):
+        """Wake anyone waiting on the manager's progress condition"""
+        if self.progress is not None:
+            with self.progress:
+                self.progress.notify_all()
     
     def run(self):
         """Enhanced worker loop with centralized error handling"""
         log('INFO', f"Worker {self.worker_id} started")
+        self.ready.set()
         
         while self.running and not STOP_EVENT.is_set():
             db = SessionLocal()
@@ -98,14 +126,18 @@ class SubtitleWorker:
                     
                     if success:
                         self.processed_count += 1
+                        if self.completions is not None:
+                            self.completions.put((self.worker_id, video_id, time.monotonic_ns()))
                         log('INFO', f"Worker {self.worker_id} completed video {video_id}")
                     else:
                         self.failed_count += 1
+                    self._notify_progress()
                         
                 except Exception as e:
                     # Use centralized exception handling
                     action = handle_worker_exception(video_id, e)
                     self.failed_count += 1
+                    self._notify_progress()
                     log('ERROR', f"Worker {self.worker_id} error (action: {action}): {str(e)}", video_id)
                 
             except Exception as e:
@@ -165,8 +197,7 @@ class SubtitleWorker:
                 db = SessionLocal()
                 
                 if success:
-                    release_video(db, video_id, 'completed')
-                    return True
+                    return release_video(db, video_id, 'completed')
                 else:
                     # Determine if this should be retried
                     video = db.query(Video).filter(Video.id == video_id).first()
@@ -231,6 +262,13 @@ class WorkerManager:
         self.threads: List[threading.Thread] = []
         self.running = False
         self.startup_recovery_done = False
+        self.signal_handlers_installed = False
+        
+        # Synchronization points so callers can wait on state changes instead of sleeping
+        self.progress = threading.Condition()
+        self.shutdown_complete = threading.Event()
+        # Per-video completion records for the current run (replaced on every start)
+        self.completions: queue.SimpleQueue = queue.SimpleQueue()
         
         # Get number of workers from settings or use default
         if num_workers is None:
@@ -244,7 +282,10 @@ class WorkerManager:
             self.num_workers = num_workers
     
     def _setup_signal_handlers(self):
-        """Setup signal handlers for graceful shutdown"""
+        """Setup signal handlers for graceful shutdown (once per manager)"""
+        if self.signal_handlers_installed:
+            return
+        
         def signal_handler(signum, frame):
             logger.info(f"Received signal {signum}, initiating graceful shutdown...")
             STOP_EVENT.set()
@@ -252,6 +293,7 @@ class WorkerManager:
         
         signal.signal(signal.SIGINT, signal_handler)
         signal.signal(signal.SIGTERM, signal_handler)
+        self.signal_handlers_installed = True
     
     def _startup_recovery(self):
         """Perform startup recovery to reset stuck videos"""
@@ -281,13 +323,15 @@ class WorkerManager:
         
         # Clear stop event
         STOP_EVENT.clear()
+        self.shutdown_complete.clear()
+        self.completions = queue.SimpleQueue()
         
         self.running = True
         logger.info(f"Starting {self.num_workers} subtitle workers...")
         
         # Create and start worker threads
         for i in range(self.num_workers):
-            worker = SubtitleWorker(i + 1)
+            worker = SubtitleWorker(i + 1, self.progress, completions=self.completions)
             thread = threading.Thread(
                 target=worker.run, 
                 name=f"SubtitleWorker-{i+1}",
@@ -349,6 +393,37 @@ class WorkerManager:
         logger.info("All subtitle workers stopped")
         self.workers.clear()
         self.threads.clear()
+        self.shutdown_complete.set()
+    
+    def wait_ready(self, timeout: float = None) -> bool:
+        """Block until every worker has entered its main loop; False on timeout"""
+        deadline = None if timeout is None else time.time() + timeout
+        for worker in list(self.workers):
+            remaining = None if deadline is None else max(deadline - time.time(), 0)
+            if not worker.ready.wait(remaining):
+                return False
+        return True
+    
+    def drain_completions(self) -> List[tuple]:
+        """Return and remove the (worker_id, video_id, done_ts_ns) records collected so far"""
+        records = []
+        while True:
+            try:
+                records.append(self.completions.get_nowait())
+            except queue.Empty:
+                return records
+    
+    def wait_stopped(self, timeout: float = None) -> bool:
+        """Block until stop() has finished its cleanup; False on timeout"""
+        return self.shutdown_complete.wait(timeout)
+    
+    def wait_for_processed(self, count: int, timeout: float = None) -> bool:
+        """Block until workers have finished (completed or failed) at least count videos"""
+        with self.progress:
+            return self.progress.wait_for(
+                lambda: sum(w.processed_count + w.failed_count for w in self.workers) >= count,
+                timeout
+            )
     
     def get_status(self) -> Dict[str, Any]:
         """Get comprehensive worker status"""
@@ -457,11 +532,19 @@ class WorkerManager:
 # Global worker manager instance
 worker_manager = WorkerManager()
 
-def start_workers(num_workers: int = None) -> Dict[str, Any]:
-    """Start subtitle workers with enhanced monitoring"""
+def start_workers(num_workers: int = None, manager: WorkerManager = None) -> Dict[str, Any]:
+    """Start subtitle workers with enhanced monitoring
+    
+    Pass manager to reuse an existing WorkerManager (it becomes the global one)
+    instead of building a new manager for a different worker count.
+    """
     global worker_manager
     try:
-        if num_workers:
+        if manager is not None:
+            if num_workers:
+                manager.num_workers = num_workers
+            worker_manager = manager
+        elif num_workers:
             worker_manager = WorkerManager(num_workers)
         worker_manager.start()
         return {
@@ -477,15 +560,16 @@ def start_workers(num_workers: int = None) -> Dict[str, Any]:
             'status': {}
         }
 
-def stop_workers() -> Dict[str, Any]:
-    """Stop subtitle workers gracefully"""
+def stop_workers(manager: WorkerManager = None) -> Dict[str, Any]:
+    """Stop subtitle workers gracefully (the global manager unless one is given)"""
     global worker_manager
+    target = manager or worker_manager
     try:
-        worker_manager.stop()
+        target.stop()
         return {
             'success': True,
             'message': 'Workers stopped successfully',
-            'status': worker_manager.get_status()
+            'status': target.get_status()
         }
     except Exception as e:
         logger.error(f"Failed to stop workers: {e}")
@@ -0,0 +1,48 @@
+"""
+Shared pytest fixtures for the backend test suite.
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add src to Python path (same layout the app uses when started from backend/src)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from db.models import init_db, SessionLocal, Channel, Video
+
+TEST_CHANNEL_URL = "https://www.youtube.com/@test-channel"
+
+
+def pytest_configure(config):
+    # Declared here so the marker is known even when pytest-xdist is not installed
+    config.addinivalue_line("markers", "xdist_group(name): run tests of the same group on one xdist worker")
+    config.addinivalue_line("markers", "serial: mutates shared server state; run with -m serial, not under -n")
+
+
+@pytest.fixture(scope="session")
+def db_schema():
+    """Run init_db() once per test session; its create_all/settings checks are the same every time"""
+    init_db()
+
+
+@pytest.fixture(scope="session")
+def test_channel(db_schema):
+    """One test channel inserted once per test session and shared across modules"""
+    db = SessionLocal()
+    try:
+        channel = db.query(Channel).filter(Channel.url == TEST_CHANNEL_URL).first()
+        if not channel:
+            channel = Channel(url=TEST_CHANNEL_URL, name="Test Channel", total_videos=0)
+            db.add(channel)
+            db.commit()
+            db.refresh(channel)
+        yield channel
+        
+        # Remove the channel together with any videos left on it
+        db.query(Video).filter(Video.channel_id == channel.id).delete(synchronize_session=False)
+        db.query(Channel).filter(Channel.id == channel.id).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
@@ -5,9 +5,14 @@ Test queue management API endpoints
 
 import requests
 import json
+from requests.adapters import HTTPAdapter
 
 BASE_URL = "http://localhost:8001"
 
+# Shared HTTP session so keep-alive reuses one connection across calls
+session = requests.Session()
+session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+
 def test_queue_api_endpoints():
     """Test the queue management API endpoints"""
     print("Testing Queue Management API Endpoints")
@@ -19,7 +24,7 @@ def test_queue_api_endpoints():
         "url": "https://www.youtube.com/@PythonExplained"
     }
     
-    response = requests.post(f"{BASE_URL}/channels/", json=channel_data)
+    response = session.post(f"{BASE_URL}/channels/", json=channel_data)
     if response.status_code == 200:
         result = response.json()
         print(f"✓ Added channel: {result.get('channels_created', 0)} channels, {result.get('videos_enqueued', 0)} videos")
@@ -29,7 +34,7 @@ def test_queue_api_endpoints():
     
     # Test video statistics
     print("\n2. Testing video statistics...")
-    response = requests.get(f"{BASE_URL}/videos/stats")
+    response = session.get(f"{BASE_URL}/videos/stats")
     if response.status_code == 200:
         stats = response.json()
         print(f"✓ Video statistics: {stats}")
@@ -39,7 +44,7 @@ def test_queue_api_endpoints():
     
     # Test video listing
     print("\n3. Testing video listing...")
-    response = requests.get(f"{BASE_URL}/videos/?status=pending&limit=5")
+    response = session.get(f"{BASE_URL}/videos/?status=pending&limit=5")
     if response.status_code == 200:
         videos = response.json()
         print(f"✓ Listed {len(videos)} pending videos")
@@ -47,7 +52,7 @@ def test_queue_api_endpoints():
         if videos:
             # Test getting a specific video
             video_id = videos[0]['id']
-            response = requests.get(f"{BASE_URL}/videos/{video_id}")
+            response = session.get(f"{BASE_URL}/videos/{video_id}")
             if response.status_code == 200:
                 video = response.json()
                 print(f"✓ Retrieved video {video_id}: {video['title']}")
@@ -60,20 +65,20 @@ def test_queue_api_endpoints():
     
     # Test channel videos
     print("\n4. Testing channel-specific videos...")
-    response = requests.get(f"{BASE_URL}/channels/")
+    response = session.get(f"{BASE_URL}/channels/")
     if response.status_code == 200:
         channels = response.json()
         if channels:
             channel_id = channels[0]['id']
             
             # Get channel videos
-            response = requests.get(f"{BASE_URL}/videos/channels/{channel_id}/videos")
+            response = session.get(f"{BASE_URL}/videos/channels/{channel_id}/videos")
             if response.status_code == 200:
                 channel_videos = response.json()
                 print(f"✓ Channel {channel_id} has {len(channel_videos)} videos")
                 
                 # Get channel stats
-                response = requests.get(f"{BASE_URL}/videos/channels/{channel_id}/stats")
+                response = session.get(f"{BASE_URL}/videos/channels/{channel_id}/stats")
                 if response.status_code == 200:
                     channel_stats = response.json()
                     print(f"✓ Channel stats: {channel_stats}")
@@ -89,7 +94,7 @@ def test_queue_api_endpoints():
     
     # Test failed videos list
     print("\n5. Testing failed videos list...")
-    response = requests.get(f"{BASE_URL}/videos/failed/list")
+    response = session.get(f"{BASE_URL}/videos/failed/list")
     if response.status_code == 200:
         failed_result = response.json()
         print(f"✓ Found {failed_result.get('count', 0)} failed videos")
@@ -99,7 +104,7 @@ def test_queue_api_endpoints():
     
     # Test job status endpoints
     print("\n6. Testing job status...")
-    response = requests.get(f"{BASE_URL}/jobs/status")
+    response = session.get(f"{BASE_URL}/jobs/status")
     if response.status_code == 200:
         job_status = response.json()
         print(f"✓ Job status: {job_status['status']}")
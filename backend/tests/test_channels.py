@@ -5,6 +5,7 @@ Test script for channel ingestion functionality.
 
 import sys
 import os
+import pytest
 
 # Add src to Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
@@ -19,13 +20,8 @@ logging.basicConfig(level=logging.INFO)
 def test_database_init():
     """Test database initialization"""
     print("Testing database initialization...")
-    try:
-        init_db()
-        print("✓ Database initialized successfully")
-        return True
-    except Exception as e:
-        print(f"✗ Database initialization failed: {e}")
-        return False
+    init_db()
+    print("✓ Database initialized successfully")
 
 def test_url_validation():
     """Test URL validation"""
@@ -49,7 +45,7 @@ def test_url_validation():
             print(f"✗ {url} -> {result} (expected {expected})")
             all_passed = False
     
-    return all_passed
+    assert all_passed
 
 def test_url_normalization():
     """Test URL normalization"""
@@ -74,31 +70,19 @@ def test_url_normalization():
             print(f"✗ {input_url} -> Error: {e}")
             all_passed = False
     
-    return all_passed
+    assert all_passed
 
-def test_database_operations():
+def test_database_operations(test_channel):
     """Test basic database operations"""
     print("\nTesting database operations...")
     
+    db = SessionLocal()
     try:
-        db = SessionLocal()
-        
-        # Test channel creation
-        test_channel = Channel(
-            url="https://www.youtube.com/@test-channel",
-            name="Test Channel",
-            total_videos=0
-        )
-        db.add(test_channel)
-        db.commit()
-        
-        # Test channel retrieval
-        retrieved = db.query(Channel).filter(Channel.url == "https://www.youtube.com/@test-channel").first()
-        if retrieved and retrieved.name == "Test Channel":
-            print("✓ Channel creation and retrieval works")
-        else:
-            print("✗ Channel creation or retrieval failed")
-            return False
+        # Test channel retrieval (the channel row is created by the shared fixture)
+        retrieved = db.query(Channel).filter(Channel.url == test_channel.url).first()
+        assert retrieved is not None
+        assert retrieved.name == "Test Channel"
+        print("✓ Channel creation and retrieval works")
         
         # Test video creation
         test_video = Video(
@@ -112,53 +96,19 @@ def test_database_operations():
         
         # Test video retrieval
         video_count = db.query(Video).filter(Video.channel_id == retrieved.id).count()
-        if video_count == 1:
-            print("✓ Video creation and retrieval works")
-        else:
-            print("✗ Video creation or retrieval failed")
-            return False
+        assert video_count == 1
+        print("✓ Video creation and retrieval works")
         
-        # Cleanup
+        # Cleanup (the fixture owns the channel row)
         db.delete(test_video)
-        db.delete(test_channel)
         db.commit()
+    finally:
         db.close()
-        
-        print("✓ Database operations test passed")
-        return True
-        
-    except Exception as e:
-        print(f"✗ Database operations test failed: {e}")
-        return False
-
-def main():
-    """Run all tests"""
-    print("Running Channel Ingestion Tests")
-    print("=" * 50)
-    
-    tests = [
-        test_database_init,
-        test_url_validation,
-        test_url_normalization,
-        test_database_operations,
-    ]
-    
-    passed = 0
-    total = len(tests)
-    
-    for test in tests:
-        if test():
-            passed += 1
-    
-    print("\n" + "=" * 50)
-    print(f"Tests passed: {passed}/{total}")
     
-    if passed == total:
-        print("🎉 All tests passed!")
-        return 0
-    else:
-        print("❌ Some tests failed!")
-        return 1
+    print("✓ Database operations test passed")
 
 if __name__ == "__main__":
-    sys.exit(main())
+    # Emoji banners would hit the codec fallback on every write to a cp1252 console
+    if sys.stdout.encoding.lower() != "utf-8":
+        sys.stdout.reconfigure(encoding="utf-8", errors="replace")
+    sys.exit(pytest.main([__file__, "-v"]))
@@ -5,130 +5,151 @@ Test script for individual video subtitle extraction functionality.
 
 import sys
 import os
+import logging
+import pytest
 import requests
 import json
+from requests.adapters import HTTPAdapter
 
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-def test_api_endpoints():
+# Shared HTTP session so keep-alive reuses one connection across calls
+session = requests.Session()
+session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+
+logger = logging.getLogger(__name__)
+
+API_SERVER_URL = "http://localhost:8003"
+PROBE_TIMEOUT = 0.5  # seconds; a local server answers well within this
+
+def probe_server(server_url: str = API_SERVER_URL) -> bool:
+    """Return True if the subtitles API answers at server_url."""
+    try:
+        response = session.get(f"{server_url}/api/subtitles/", timeout=PROBE_TIMEOUT)
+        return response.status_code == 200
+    except requests.exceptions.RequestException:
+        return False
+
+@pytest.fixture(scope="session")
+def live_server():
+    """Base URL of the running API server; skips API tests when it is down"""
+    if not probe_server():
+        pytest.skip("API server not running at " + API_SERVER_URL)
+    return API_SERVER_URL
+
+def test_api_endpoints(live_server):
     """Test the new API endpoints for individual video extraction."""
     
-    base_url = "http://localhost:8003/api/subtitles"
+    base_url = f"{live_server}/api/subtitles"
     test_video_url = "https://www.youtube.com/watch?v=ZQUxL4Jm1Lo"  # TED talk with subtitles
     
-    print("🧪 Testing Individual Video Subtitle Extraction API")
-    print("=" * 60)
-    print()
+    logger.debug("🧪 Testing Individual Video Subtitle Extraction API")
+    logger.debug("=" * 60)
     
     # Test 1: Get video info
-    print("1. Testing video info endpoint...")
+    logger.debug("1. Testing video info endpoint...")
     try:
-        response = requests.post(f"{base_url}/info", 
-                               json={"video_url": test_video_url},
-                               timeout=30)
+        response = session.post(f"{base_url}/info", 
+                              json={"video_url": test_video_url},
+                              timeout=30)
         
         if response.status_code == 200:
             data = response.json()
-            print("✅ Video info retrieved successfully")
-            print(f"   Title: {data['video_info']['title']}")
-            print(f"   Duration: {data['video_info']['duration']} seconds")
-            print(f"   Native languages: {data['subtitle_availability']['native_languages'][:5]}...")
-            print(f"   Auto-generated languages: {len(data['subtitle_availability']['auto_generated_languages'])} available")
+            logger.debug("✅ Video info retrieved successfully")
+            logger.debug("   Title: %s", data['video_info']['title'])
+            logger.debug("   Duration: %s seconds", data['video_info']['duration'])
+            logger.debug("   Native languages: %s...", data['subtitle_availability']['native_languages'][:5])
+            logger.debug("   Auto-generated languages: %s available", len(data['subtitle_availability']['auto_generated_languages']))
         else:
-            print(f"❌ Failed: {response.status_code} - {response.text}")
+            logger.debug("❌ Failed: %s - %s", response.status_code, response.text)
     except Exception as e:
-        print(f"❌ Error: {e}")
+        logger.debug("❌ Error: %s", e)
     
-    print()
     
     # Test 2: Extract subtitles
-    print("2. Testing subtitle extraction endpoint...")
+    logger.debug("2. Testing subtitle extraction endpoint...")
     try:
-        response = requests.post(f"{base_url}/extract",
-                               json={
-                                   "video_url": test_video_url,
-                                   "preferred_languages": ["en"],
-                                   "include_auto_generated": False
-                               },
-                               timeout=60)
+        response = session.post(f"{base_url}/extract",
+                              json={
+                                  "video_url": test_video_url,
+                                  "preferred_languages": ["en"],
+                                  "include_auto_generated": False
+                              },
+                              timeout=60)
         
         if response.status_code == 200:
             data = response.json()
-            print("✅ Subtitles extracted successfully")
-            print(f"   Language: {data['subtitle_info']['language']}")
-            print(f"   Content length: {data['subtitle_info']['content_length']} characters")
-            print(f"   Format: {data['subtitle_info']['format']}")
-            print(f"   Auto-generated: {data['subtitle_info']['is_auto_generated']}")
-            print(f"   Preview: {data['subtitle_info']['content'][:100]}...")
+            logger.debug("✅ Subtitles extracted successfully")
+            logger.debug("   Language: %s", data['subtitle_info']['language'])
+            logger.debug("   Content length: %s characters", data['subtitle_info']['content_length'])
+            logger.debug("   Format: %s", data['subtitle_info']['format'])
+            logger.debug("   Auto-generated: %s", data['subtitle_info']['is_auto_generated'])
+            logger.debug("   Preview: %s...", data['subtitle_info']['content'][:100])
         else:
-            print(f"❌ Failed: {response.status_code} - {response.text}")
+            logger.debug("❌ Failed: %s - %s", response.status_code, response.text)
     except Exception as e:
-        print(f"❌ Error: {e}")
+        logger.debug("❌ Error: %s", e)
     
-    print()
     
     # Test 3: Batch extraction (small batch)
-    print("3. Testing batch extraction endpoint...")
+    logger.debug("3. Testing batch extraction endpoint...")
     test_urls = [
         "https://www.youtube.com/watch?v=ZQUxL4Jm1Lo",  # TED talk
         "https://www.youtube.com/watch?v=8jPQjjsBbIc"   # Another TED talk
     ]
     
     try:
-        response = requests.post(f"{base_url}/batch-extract",
-                               json={
-                                   "video_urls": test_urls,
-                                   "preferred_languages": ["en"]
-                               },
-                               timeout=120)
+        response = session.post(f"{base_url}/batch-extract",
+                              json={
+                                  "video_urls": test_urls,
+                                  "preferred_languages": ["en"]
+                              },
+                              timeout=120)
         
         if response.status_code == 200:
             data = response.json()
-            print("✅ Batch extraction completed")
-            print(f"   Total requested: {data['total_requested']}")
-            print(f"   Successful: {data['successful_extractions']}")
-            print(f"   Failed: {data['failed_extractions']}")
+            logger.debug("✅ Batch extraction completed")
+            logger.debug("   Total requested: %s", data['total_requested'])
+            logger.debug("   Successful: %s", data['successful_extractions'])
+            logger.debug("   Failed: %s", data['failed_extractions'])
             
             for result in data['results']:
                 status = "✅" if result['success'] else "❌"
-                print(f"   {status} {result['video_title'][:50]}...")
+                logger.debug("   %s %s...", status, result['video_title'][:50])
         else:
-            print(f"❌ Failed: {response.status_code} - {response.text}")
+            logger.debug("❌ Failed: %s - %s", response.status_code, response.text)
     except Exception as e:
-        print(f"❌ Error: {e}")
+        logger.debug("❌ Error: %s", e)
 
 def test_direct_functions():
     """Test the functions directly without API."""
     
     from utils.yt_dlp_helper import extract_single_video_subtitles, get_video_info_only
     
-    print()
-    print("🔬 Testing Direct Function Calls")
-    print("=" * 40)
-    print()
+    logger.debug("🔬 Testing Direct Function Calls")
+    logger.debug("=" * 40)
     
     test_video_url = "https://www.youtube.com/watch?v=ZQUxL4Jm1Lo"
     
     # Test 1: Video info
-    print("1. Testing get_video_info_only()...")
+    logger.debug("1. Testing get_video_info_only()...")
     try:
         result = get_video_info_only(test_video_url)
         if result['success']:
-            print("✅ Video info extracted successfully")
-            print(f"   Title: {result['title']}")
-            print(f"   Duration: {result['duration']} seconds")
-            print(f"   Uploader: {result['uploader']}")
-            print(f"   Native subtitles: {result['available_subtitle_languages']}")
+            logger.debug("✅ Video info extracted successfully")
+            logger.debug("   Title: %s", result['title'])
+            logger.debug("   Duration: %s seconds", result['duration'])
+            logger.debug("   Uploader: %s", result['uploader'])
+            logger.debug("   Native subtitles: %s", result['available_subtitle_languages'])
         else:
-            print(f"❌ Failed: {result['error']}")
+            logger.debug("❌ Failed: %s", result['error'])
     except Exception as e:
-        print(f"❌ Error: {e}")
+        logger.debug("❌ Error: %s", e)
     
-    print()
     
     # Test 2: Subtitle extraction
-    print("2. Testing extract_single_video_subtitles()...")
+    logger.debug("2. Testing extract_single_video_subtitles()...")
     try:
         result = extract_single_video_subtitles(
             video_url=test_video_url,
@@ -137,32 +158,32 @@ def test_direct_functions():
         )
         
         if result['success']:
-            print("✅ Subtitles extracted successfully")
-            print(f"   Title: {result['video_title']}")
-            print(f"   Language: {result['language']}")
-            print(f"   Content length: {result['content_length']} characters")
-            print(f"   Format: {result['subtitle_format']}")
-            print(f"   Preview: {result['content'][:150]}...")
+            logger.debug("✅ Subtitles extracted successfully")
+            logger.debug("   Title: %s", result['video_title'])
+            logger.debug("   Language: %s", result['language'])
+            logger.debug("   Content length: %s characters", result['content_length'])
+            logger.debug("   Format: %s", result['subtitle_format'])
+            logger.debug("   Preview: %s...", result['content'][:150])
         else:
-            print(f"❌ Failed: {result['error']}")
-            print(f"   Is transient error: {result['is_transient_error']}")
+            logger.debug("❌ Failed: %s", result['error'])
+            logger.debug("   Is transient error: %s", result['is_transient_error'])
     except Exception as e:
-        print(f"❌ Error: {e}")
+        logger.debug("❌ Error: %s", e)
 
 if __name__ == "__main__":
+    # Surface the per-test details when run as a script; pytest runs stay quiet
+    logging.basicConfig(format="%(message)s")
+    logger.setLevel(logging.DEBUG)
+    
     print("🎯 Individual Video Subtitle Extraction Test Suite")
     print("=" * 60)
     print()
     
     # Check if API server is running
-    try:
-        response = requests.get("http://localhost:8003/api/subtitles/", timeout=5)
-        if response.status_code == 200:
-            print("✅ API server is running")
-            test_api_endpoints()
-        else:
-            print("⚠️  API server not responding correctly")
-    except:
+    if probe_server():
+        print("✅ API server is running")
+        test_api_endpoints(API_SERVER_URL)
+    else:
         print("⚠️  API server not running, testing direct functions only")
     
     test_direct_functions()
@@ -7,196 +7,187 @@ Tests atomic video claiming, status management, reconciliation, and recovery.
 import sys
 import os
 import threading
-import time
-import random
+import pytest
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Add src to Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from db.models import init_db, SessionLocal, Channel, Video, Subtitle, Log
+from db.models import ScopedSession, Channel, Video, Subtitle
 from utils.queue_manager import (
     claim_next_video,
-    release_video,
+    claim_next_videos,
+    release_video_state,
     reset_processing_videos,
     reconcile_video_statuses,
-    get_queue_statistics,
-    get_channel_statistics,
-    retry_failed_video,
-    get_failed_videos
+    get_combined_statistics,
+    retry_failed_video
 )
+from sqlalchemy import text, update
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Configure logging; the queue helpers log every claim/release at INFO, keep the
+# threaded claim tests from spending their time formatting those records
+logging.basicConfig(level=logging.WARNING)
 
-def setup_test_data():
+# claim_next_videos and the reset/reconcile helpers act on the whole videos table, not a
+# channel, so per-test id ranges can't keep these tests apart; under `pytest -n auto
+# --dist loadgroup` they share a worker with the other modules that mutate the queue.
+pytestmark = pytest.mark.xdist_group("app_db")
+
+# Fixture rows live under their own URL scheme so cleanup can match on a prefix
+TEST_CHANNEL_URL = "test://channel/queue-management"
+TEST_URL_GLOB = "test://*"  # GLOB is case-sensitive, so SQLite can use the unique url index
+
+def delete_test_rows(db):
+    """Delete the test channels; their videos and subtitles go with them via ON DELETE CASCADE"""
+    # SQLite only enforces the schema's cascades with foreign_keys on, and the pragma is
+    # ignored inside a transaction, so end any open one first
+    db.rollback()
+    db.execute(text("PRAGMA foreign_keys = ON"))
+    try:
+        db.execute(text("DELETE FROM channels WHERE url GLOB :pattern"), {"pattern": TEST_URL_GLOB})
+        db.commit()
+    finally:
+        db.execute(text("PRAGMA foreign_keys = OFF"))
+
+def setup_test_data(db):
     """Create test channel and videos"""
-    db = SessionLocal()
     try:
         # Clean up existing test data
-        db.query(Video).filter(Video.url.like('%test%')).delete(synchronize_session=False)
-        db.query(Channel).filter(Channel.url.like('%test%')).delete(synchronize_session=False)
-        db.commit()
+        delete_test_rows(db)
         
         # Create test channel
         test_channel = Channel(
-            url="https://www.youtube.com/@test-queue-management",
+            url=TEST_CHANNEL_URL,
             name="Test Queue Management",
             total_videos=0
         )
         db.add(test_channel)
         db.flush()
         
-        # Create test videos
-        test_videos = []
-        for i in range(10):
-            video = Video(
-                channel_id=test_channel.id,
-                url=f"https://www.youtube.com/watch?v=test{i:03d}",
-                title=f"Test Video {i:03d}",
-                status='pending',
-                attempts=0
-            )
-            test_videos.append(video)
-            db.add(video)
-        
+        # Create test videos in one multi-row INSERT
+        db.bulk_insert_mappings(Video, [
+            {
+                "channel_id": test_channel.id,
+                "url": f"{TEST_CHANNEL_URL}/video/{i:03d}",
+                "title": f"Test Video {i:03d}",
+                "status": 'pending',
+                "attempts": 0
+            }
+            for i in range(10)
+        ])
         db.commit()
         
-        print(f"✓ Created test channel with {len(test_videos)} videos")
-        return test_channel.id, [v.id for v in test_videos]
+        video_ids = [video_id for (video_id,) in db.query(Video.id).filter(Video.channel_id == test_channel.id).order_by(Video.id)]
+        print(f"✓ Created test channel with {len(video_ids)} videos")
+        return test_channel.id, video_ids
         
     except Exception as e:
         db.rollback()
         print(f"✗ Failed to setup test data: {e}")
         return None, []
-    finally:
-        db.close()
 
-def test_atomic_claiming():
+def test_atomic_claiming(db):
     """Test that only one worker can claim a video at a time"""
     print("\n🧪 Testing atomic video claiming...")
     
-    def worker_claim_videos(worker_id, results):
+    num_workers = 5
+    # Release every worker into its claim at the same moment for real contention
+    start_barrier = threading.Barrier(num_workers)
+    
+    def worker_claim_videos(worker_id):
         """Worker function to claim videos"""
-        claimed_videos = []
-        db = SessionLocal()
+        # Per-thread session from the shared registry (SQLite connections are not shared across threads)
+        thread_db = ScopedSession()
         try:
-            for _ in range(5):  # Try to claim up to 5 videos
-                video_id = claim_next_video(db)
-                if video_id:
-                    claimed_videos.append(video_id)
-                    time.sleep(0.01)  # Small delay to increase chance of race conditions
-                else:
-                    break
+            start_barrier.wait()
+            # Claim up to 5 videos in a single atomic statement
+            return worker_id, claim_next_videos(thread_db, 5)
         finally:
-            db.close()
-        
-        results[worker_id] = claimed_videos
+            ScopedSession.remove()
     
     # Run multiple workers concurrently
-    results = {}
-    threads = []
-    
-    for i in range(5):  # 5 workers
-        thread = threading.Thread(target=worker_claim_videos, args=(i, results))
-        threads.append(thread)
-        thread.start()
-    
-    # Wait for all threads to complete
-    for thread in threads:
-        thread.join()
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        futures = [executor.submit(worker_claim_videos, i) for i in range(num_workers)]
+        results = [future.result() for future in as_completed(futures)]
     
     # Verify results
-    all_claimed = []
-    for worker_id, claimed in results.items():
+    for worker_id, claimed in results:
         print(f"  Worker {worker_id} claimed: {claimed}")
-        all_claimed.extend(claimed)
     
-    # Check for duplicates
-    if len(all_claimed) == len(set(all_claimed)):
-        print("✓ No duplicate claims - atomic claiming works correctly")
-        return True
-    else:
-        print("✗ Duplicate claims detected - atomic claiming failed")
-        return False
+    # Check for duplicates while streaming over the claims; stops at the first collision
+    all_claimed = set()
+    duplicate = next(
+        (video_id for _, claimed in results for video_id in claimed
+         if video_id in all_claimed or all_claimed.add(video_id)),
+        None
+    )
+    if duplicate is not None:
+        pytest.fail(f"Duplicate claims detected - atomic claiming failed (video {duplicate})")
+    
+    # Every claimed video must now be in processing; verify them all with one query
+    rows = db.query(Video.id, Video.status).filter(Video.id.in_(all_claimed)).all()
+    not_processing = [(video_id, status) for video_id, status in rows if status != 'processing']
+    if len(rows) != len(all_claimed) or not_processing:
+        pytest.fail(f"Claimed videos not all in processing state: {not_processing}")
+    
+    print("✓ No duplicate claims - atomic claiming works correctly")
 
-def test_status_transitions():
+def test_status_transitions(db):
     """Test video status transitions and retry logic"""
     print("\n🧪 Testing status transitions...")
     
-    db = SessionLocal()
     try:
         # Claim a video
-        video_id = claim_next_video(db)
-        if not video_id:
-            print("✗ No video available to claim")
-            return False
+        completed_id = claim_next_video(db)
+        if not completed_id:
+            pytest.fail("No video available to claim")
         
-        # Test successful completion
-        success = release_video(db, video_id, 'completed')
-        if not success:
-            print("✗ Failed to mark video as completed")
-            return False
-        
-        # Verify status
-        video = db.query(Video).filter(Video.id == video_id).first()
-        if video.status != 'completed':
-            print(f"✗ Video status not updated correctly: {video.status}")
-            return False
+        # Test successful completion; release_video_state returns the row's new state
+        released = release_video_state(db, completed_id, 'completed')
+        if released is None:
+            pytest.fail("Failed to mark video as completed")
+        if released.status != 'completed':
+            pytest.fail(f"Video status not updated correctly: {released.status}")
         
         print("✓ Successful completion transition works")
         
         # Test failure with retry
-        video_id = claim_next_video(db)
-        if video_id:
-            success = release_video(db, video_id, 'failed', 'Test error message')
-            if not success:
-                print("✗ Failed to mark video as failed")
-                return False
+        failed_id = claim_next_video(db)
+        if failed_id:
+            released = release_video_state(db, failed_id, 'failed', 'Test error message')
+            if released is None:
+                pytest.fail("Failed to mark video as failed")
+            status, attempts = released
             
             # Check that it was requeued (attempts < max_retries)
-            video = db.query(Video).filter(Video.id == video_id).first()
-            if video.status == 'pending' and video.attempts == 1:
+            if status == 'pending' and attempts == 1:
                 print("✓ Failed video requeued for retry")
-            elif video.status == 'failed':
+            elif status == 'failed':
                 print("✓ Video marked as permanently failed")
             else:
-                print(f"✗ Unexpected video state: status={video.status}, attempts={video.attempts}")
-                return False
+                pytest.fail(f"Unexpected video state: status={status}, attempts={attempts}")
         else:
             print("✓ No more videos available (all claimed)")
         
-        return True
-        
     except Exception as e:
-        print(f"✗ Status transition test failed: {e}")
-        return False
-    finally:
-        db.close()
+        pytest.fail(f"Status transition test failed: {e}")
 
-def test_reconciliation():
+def test_reconciliation(db, seed_videos):
     """Test queue reconciliation functionality"""
     print("\n🧪 Testing queue reconciliation...")
     
-    db = SessionLocal()
     try:
-        # Create a video and manually add a subtitle to test reconciliation
-        # First, get any processing video or create one
-        processing_video = db.query(Video).filter(Video.status == 'processing').first()
-        if not processing_video:
-            # Get a pending video and set it to processing
-            pending_video = db.query(Video).filter(Video.status == 'pending').first()
-            if pending_video:
-                pending_video.status = 'processing'
-                db.commit()
-                processing_video = pending_video
-        
-        if not processing_video:
-            print("✗ No video available for reconciliation test")
-            return False
-        
-        video_id = processing_video.id
+        # Put one of this test's videos in processing, as if a worker had claimed it
+        _, video_ids = seed_videos
+        video_id = video_ids[0]
+        db.execute(
+            update(Video)
+            .where(Video.id == video_id)
+            .values(status='processing')
+            .execution_options(synchronize_session=False)
+        )
         
         # Manually create a subtitle for this video
         subtitle = Subtitle(
@@ -217,35 +208,29 @@ def test_reconciliation():
         video = db.query(Video).filter(Video.id == video_id).first()
         if video.status == 'completed':
             print("✓ Reconciliation correctly marked video as completed")
-            return True
         else:
-            print(f"✗ Reconciliation failed: video status is {video.status}")
-            return False
+            pytest.fail(f"Reconciliation failed: video status is {video.status}")
         
     except Exception as e:
-        print(f"✗ Reconciliation test failed: {e}")
-        return False
-    finally:
-        db.close()
+        pytest.fail(f"Reconciliation test failed: {e}")
 
-def test_crash_recovery():
+def test_crash_recovery(db, seed_videos):
     """Test crash recovery functionality"""
     print("\n🧪 Testing crash recovery...")
     
-    db = SessionLocal()
     try:
-        # Manually set some videos to 'processing' to simulate crash
-        # SQLite doesn't support LIMIT in UPDATE, so use a subquery
-        pending_videos = db.query(Video).filter(Video.status == 'pending').limit(3).all()
-        processing_count = len(pending_videos)
-        
-        for video in pending_videos:
-            video.status = 'processing'
+        # Manually set three of this test's videos to 'processing' to simulate a crash
+        _, video_ids = seed_videos
+        processing_count = db.execute(
+            update(Video)
+            .where(Video.id.in_(video_ids[:3]))
+            .values(status='processing')
+            .execution_options(synchronize_session=False)
+        ).rowcount
         db.commit()
         
         if processing_count == 0:
-            print("✗ No videos to test crash recovery with")
-            return False
+            pytest.fail("No videos to test crash recovery with")
         
         print(f"  Simulated crash with {processing_count} processing videos")
         
@@ -257,160 +242,100 @@ def test_crash_recovery():
         # So we check that it reset at least the ones we set
         if reset_count >= processing_count:
             print("✓ Crash recovery correctly reset processing videos")
-            return True
         else:
-            print(f"✗ Crash recovery failed: expected at least {processing_count}, got {reset_count}")
-            return False
+            pytest.fail(f"Crash recovery failed: expected at least {processing_count}, got {reset_count}")
         
     except Exception as e:
-        print(f"✗ Crash recovery test failed: {e}")
-        return False
-    finally:
-        db.close()
+        pytest.fail(f"Crash recovery test failed: {e}")
 
-def test_statistics():
+def test_statistics(db, seed_videos):
     """Test queue statistics functionality"""
     print("\n🧪 Testing queue statistics...")
     
-    db = SessionLocal()
     try:
-        # Get overall statistics
-        overall_stats = get_queue_statistics(db)
+        # Get overall and channel-specific statistics in one aggregation
+        channel_id, _ = seed_videos
+        overall_stats, channel_stats = get_combined_statistics(db, channel_id)
         print(f"  Overall queue stats: {overall_stats}")
-        
-        # Get channel-specific statistics
-        channel_id = db.query(Channel).filter(Channel.url.like('%test%')).first().id
-        channel_stats = get_channel_statistics(db, channel_id)
         print(f"  Channel {channel_id} stats: {channel_stats}")
         
         # Verify statistics make sense
         if overall_stats['total'] > 0 and channel_stats['total'] > 0:
             print("✓ Statistics functions return valid data")
-            return True
         else:
-            print("✗ Statistics functions returned invalid data")
-            return False
+            pytest.fail("Statistics functions returned invalid data")
         
     except Exception as e:
-        print(f"✗ Statistics test failed: {e}")
-        return False
-    finally:
-        db.close()
+        pytest.fail(f"Statistics test failed: {e}")
 
-def test_failed_video_retry():
+def test_failed_video_retry(db, seed_videos):
     """Test manual retry of failed videos"""
     print("\n🧪 Testing failed video retry...")
     
-    db = SessionLocal()
     try:
-        # Claim and fail a video multiple times to make it permanently failed
-        # First, let's get any pending video
-        pending_video = db.query(Video).filter(Video.status == 'pending').first()
-        if not pending_video:
-            print("✗ No pending video available for retry test")
-            return False
-        
-        video_id = pending_video.id
+        _, video_ids = seed_videos
+        video_id = video_ids[0]
         
         # Manually set it to failed with high attempts
-        pending_video.status = 'failed'
-        pending_video.attempts = 5  # More than max_retries (3)
-        pending_video.last_error = 'Test permanent failure'
+        db.execute(
+            update(Video)
+            .where(Video.id == video_id)
+            .values(status='failed', attempts=5, last_error='Test permanent failure')  # More than max_retries (3)
+            .execution_options(synchronize_session=False)
+        )
         db.commit()
         
-        print(f"  Video {video_id} is set to permanently failed with {pending_video.attempts} attempts")
+        print(f"  Video {video_id} is set to permanently failed with 5 attempts")
         
         # Test manual retry
         success = retry_failed_video(db, video_id)
         if not success:
-            print("✗ Manual retry failed")
-            return False
+            pytest.fail("Manual retry failed")
         
         # Check if it was reset
         video = db.query(Video).filter(Video.id == video_id).first()
         if video.status == 'pending' and video.attempts == 0:
             print("✓ Manual retry successfully reset failed video")
-            return True
         else:
-            print(f"✗ Manual retry failed: status={video.status}, attempts={video.attempts}")
-            return False
+            pytest.fail(f"Manual retry failed: status={video.status}, attempts={video.attempts}")
         
     except Exception as e:
-        print(f"✗ Failed video retry test failed: {e}")
-        return False
-    finally:
-        db.close()
+        pytest.fail(f"Failed video retry test failed: {e}")
 
-def cleanup_test_data():
+def cleanup_test_data(db):
     """Clean up test data"""
-    db = SessionLocal()
     try:
-        # Remove test data
-        db.query(Subtitle).filter(Subtitle.content.like('%Test%')).delete(synchronize_session=False)
-        db.query(Video).filter(Video.url.like('%test%')).delete(synchronize_session=False)
-        db.query(Channel).filter(Channel.url.like('%test%')).delete(synchronize_session=False)
-        db.commit()
+        # Remove test data (one DELETE; videos and subtitles cascade)
+        delete_test_rows(db)
         print("✓ Cleaned up test data")
     except Exception as e:
         print(f"✗ Failed to cleanup test data: {e}")
-    finally:
-        db.close()
 
-def main():
-    """Run all queue management tests"""
-    print("Testing Queue Management Functionality")
-    print("=" * 50)
+@pytest.fixture(scope="module")
+def db():
+    """One session shared by every test in the module; the pool checkout happens once"""
+    session = ScopedSession()
+    yield session
+    ScopedSession.remove()
+
+@pytest.fixture(autouse=True)
+def seed_videos(db, db_schema):
+    """Seed a fresh test channel with 10 pending videos for every test.
     
-    try:
-        # Initialize database
-        init_db()
-        print("✓ Database initialized")
-        
-        # Setup test data
-        channel_id, video_ids = setup_test_data()
-        if not channel_id:
-            print("❌ Failed to setup test data")
-            return 1
-        
-        # Run tests
-        tests = [
-            ("Atomic Video Claiming", test_atomic_claiming),
-            ("Status Transitions", test_status_transitions),
-            ("Queue Reconciliation", test_reconciliation),
-            ("Crash Recovery", test_crash_recovery),
-            ("Queue Statistics", test_statistics),
-            ("Failed Video Retry", test_failed_video_retry),
-        ]
-        
-        passed = 0
-        total = len(tests)
-        
-        for test_name, test_func in tests:
-            print(f"\n🧪 {test_name}")
-            try:
-                if test_func():
-                    print(f"✅ {test_name} PASSED")
-                    passed += 1
-                else:
-                    print(f"❌ {test_name} FAILED")
-            except Exception as e:
-                print(f"❌ {test_name} ERROR: {e}")
-        
-        # Cleanup
-        cleanup_test_data()
-        
-        print(f"\n📊 Results: {passed}/{total} tests passed")
-        
-        if passed == total:
-            print("🎉 All queue management tests passed!")
-            return 0
-        else:
-            print("❌ Some queue management tests failed!")
-            return 1
-            
-    except Exception as e:
-        print(f"❌ Test setup failed: {e}")
-        return 1
+    The claim tests leave rows in processing, so sharing one seed across the
+    module would make each test depend on what ran before it.
+    """
+    channel_id, video_ids = setup_test_data(db)
+    if not channel_id:
+        pytest.fail("Failed to setup test data")
+    yield channel_id, video_ids
+    cleanup_test_data(db)
+
+@pytest.fixture(autouse=True)
+def discard_open_transaction(db):
+    """Don't let a failed test's open transaction leak into the next one"""
+    yield
+    db.rollback()
 
 if __name__ == "__main__":
-    sys.exit(main())
+    sys.exit(pytest.main([__file__, "-v"]))
@@ -13,7 +13,10 @@ import tempfile
 # Add src to Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from db.models import init_db, SessionLocal, Video, Channel, Subtitle, Setting
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.pool import StaticPool
+
+from db.models import Base, init_db, get_db, SessionLocal, Video, Channel, Subtitle, Setting
 from utils.subtitle_processor import SubtitleProcessor, process_video_subtitles
 from utils.yt_dlp_helper import fetch_subtitle_text, is_transient_error
 from api.subtitles import router
@@ -25,13 +28,71 @@ test_app = FastAPI()
 test_app.include_router(router)
 client = TestClient(test_app)
 
+TRANSIENT_ERROR_MESSAGES = [
+    "Connection timeout",
+    "Network error",
+    "HTTP 500 server error",
+    "Rate limit exceeded"
+]
+
+PERMANENT_ERROR_MESSAGES = [
+    "Video not found",
+    "HTTP 404 error",
+    "Private video",
+    "Video unavailable"
+]
+
 class TestSubtitleScraping(unittest.TestCase):
     """Test cases for subtitle scraping functionality"""
     
+    @classmethod
+    def setUpClass(cls):
+        """Build the schema once in a private in-memory database"""
+        # StaticPool hands every checkout the same connection, so the in-memory
+        # database lives for the whole class instead of vanishing per connection
+        cls.engine = create_engine(
+            "sqlite:///:memory:",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool
+        )
+        
+        # pysqlite never emits BEGIN itself, so the per-test outer transaction would
+        # roll back nothing; hand transaction control to SQLAlchemy
+        @event.listens_for(cls.engine, "connect")
+        def disable_pysqlite_transactions(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+        
+        @event.listens_for(cls.engine, "begin")
+        def emit_begin(conn):
+            conn.exec_driver_sql("BEGIN")
+        
+        Base.metadata.create_all(bind=cls.engine)
+        with cls.engine.begin() as conn:
+            conn.execute(Setting.__table__.insert().values(id=1))
+        cls.connection = cls.engine.connect()
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.connection.close()
+        cls.engine.dispose()
+    
     def setUp(self):
-        """Set up test database and data"""
-        init_db()
-        self.db = SessionLocal()
+        """Set up test data inside a transaction that tearDown rolls back"""
+        # Join the session into an external transaction: the code under test can
+        # commit freely, each commit only releases a SAVEPOINT that is reopened
+        self.trans = self.connection.begin()
+        # expire_on_commit=False: objects the test holds keep their state across the
+        # processor's commits instead of reloading on the next attribute access
+        self.db = SessionLocal(bind=self.connection, expire_on_commit=False)
+        self.nested = self.connection.begin_nested()
+        
+        @event.listens_for(self.db, "after_transaction_end")
+        def restart_savepoint(session, transaction):
+            if not self.nested.is_active:
+                self.nested = self.connection.begin_nested()
+        
+        # The API under test reads through the same session
+        test_app.dependency_overrides[get_db] = lambda: self.db
         
         # Create test channel
         self.test_channel = Channel(
@@ -52,12 +113,10 @@ class TestSubtitleScraping(unittest.TestCase):
         self.db.commit()
     
     def tearDown(self):
-        """Clean up test data"""
-        self.db.query(Subtitle).delete()
-        self.db.query(Video).delete()
-        self.db.query(Channel).delete()
-        self.db.commit()
+        """Discard everything the test wrote"""
+        test_app.dependency_overrides.clear()
         self.db.close()
+        self.trans.rollback()
     
     @patch('utils.yt_dlp_helper.fetch_subtitle_text')
     def test_successful_subtitle_extraction(self, mock_fetch):
@@ -72,8 +131,7 @@ class TestSubtitleScraping(unittest.TestCase):
         # Verify success
         self.assertTrue(result)
         
-        # Check database state
-        self.db.refresh(self.test_video)
+        # Check database state (the processor updated this same instance)
         self.assertEqual(self.test_video.status, 'completed')
         self.assertIsNotNone(self.test_video.completed_at)
         
@@ -127,30 +185,6 @@ class TestSubtitleScraping(unittest.TestCase):
         # The video might be marked as failed but with attempts incremented for retry
         self.assertGreater(self.test_video.attempts, 0)
     
-    def test_error_classification(self):
-        """Test transient vs permanent error classification"""
-        # Test transient errors
-        transient_errors = [
-            Exception("Connection timeout"),
-            Exception("Network error"),
-            Exception("HTTP 500 server error"),
-            Exception("Rate limit exceeded")
-        ]
-        
-        for error in transient_errors:
-            self.assertTrue(is_transient_error(error), f"Should be transient: {error}")
-        
-        # Test permanent errors
-        permanent_errors = [
-            Exception("Video not found"),
-            Exception("HTTP 404 error"),
-            Exception("Private video"),
-            Exception("Video unavailable")
-        ]
-        
-        for error in permanent_errors:
-            self.assertFalse(is_transient_error(error), f"Should be permanent: {error}")
-    
     def test_subtitle_api_endpoints(self):
         """Test subtitle API endpoints"""
         # Create test subtitle
@@ -193,13 +227,14 @@ class TestSubtitleScraping(unittest.TestCase):
         """Test support for multiple subtitle languages"""
         # Create subtitles in multiple languages
         languages = ['en', 'es', 'fr']
-        for lang in languages:
-            subtitle = Subtitle(
-                video_id=self.test_video.id,
-                language=lang,
-                content=f'Test content in {lang}'
-            )
-            self.db.add(subtitle)
+        self.db.execute(insert(Subtitle), [
+            {
+                'video_id': self.test_video.id,
+                'language': lang,
+                'content': f'Test content in {lang}'
+            }
+            for lang in languages
+        ])
         self.db.commit()
         
         # Test video download with multiple languages
@@ -234,6 +269,19 @@ Line 2 with   extra   spaces."""
         self.assertNotIn('<', subtitle.content)
         self.assertNotIn('>', subtitle.content)
 
+class TestErrorClassification(unittest.TestCase):
+    """Transient vs permanent error classification; needs no database fixture"""
+    
+    def test_transient_errors(self):
+        for message in TRANSIENT_ERROR_MESSAGES:
+            with self.subTest(error=message):
+                self.assertTrue(is_transient_error(Exception(message)))
+    
+    def test_permanent_errors(self):
+        for message in PERMANENT_ERROR_MESSAGES:
+            with self.subTest(error=message):
+                self.assertFalse(is_transient_error(Exception(message)))
+
 def run_integration_test():
     """Run integration test with actual API"""
     print("Running Subtitle Scraping Integration Test")
@@ -289,9 +337,10 @@ def run_integration_test():
             print("⚠ Subtitle processing failed (might be expected if video has no subtitles)")
         
         # Clean up
-        db.query(Subtitle).filter(Subtitle.video_id == test_video.id).delete()
-        db.query(Video).filter(Video.id == test_video.id).delete()
-        db.query(Channel).filter(Channel.id == test_channel.id).delete()
+        # One transaction; skip the session sync since the session closes right after
+        db.query(Subtitle).filter(Subtitle.video_id == test_video.id).delete(synchronize_session=False)
+        db.query(Video).filter(Video.id == test_video.id).delete(synchronize_session=False)
+        db.query(Channel).filter(Channel.id == test_channel.id).delete(synchronize_session=False)
         db.commit()
         db.close()
         
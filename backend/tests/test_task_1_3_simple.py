@@ -13,21 +13,78 @@ Usage:
 import sys
 import os
 import json
+import importlib
 import time
-import urllib.request
-import urllib.parse
-import urllib.error
+import threading
+import http.client
+from concurrent.futures import ThreadPoolExecutor
 
 # Add src to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
+# Modules under test, imported once here; test_01 reports failures and later tests reuse the refs
+MODULES_UNDER_TEST = [
+    ("yt_dlp_helper module", "utils.yt_dlp_helper"),
+    ("subtitle_processor module", "utils.subtitle_processor"),
+    ("worker module", "workers.worker"),
+    ("API subtitles router", "api.subtitles"),
+    ("API jobs router", "api.jobs"),
+]
+_MODULES = {}
+_IMPORT_ERRORS = {}
+for _label, _name in MODULES_UNDER_TEST:
+    try:
+        _MODULES[_name] = importlib.import_module(_name)
+    except Exception as e:
+        _IMPORT_ERRORS[_name] = str(e)
+
 # Test configuration
-API_BASE_URL = "http://localhost:8003"
+API_HOST = "localhost"
+API_PORT = 8003
+API_BASE_URL = f"http://{API_HOST}:{API_PORT}"
+
+# Set FAST_FAIL=1 to skip the remaining tests once an infrastructure test fails
+FAST_FAIL = os.environ.get("FAST_FAIL") == "1"
+
 TEST_RESULTS = {
     'passed': 0,
     'failed': 0,
     'warnings': 0
 }
+_RESULTS_LOCK = threading.Lock()
+
+# Every request goes to the same host, so each thread keeps one connection alive for
+# the whole run (http.client connections can't be shared between threads)
+_LOCAL = threading.local()
+
+def _connection():
+    """This thread's keep-alive connection to the API server"""
+    conn = getattr(_LOCAL, 'conn', None)
+    if conn is None:
+        conn = _LOCAL.conn = http.client.HTTPConnection(API_HOST, API_PORT, timeout=10)
+    return conn
+
+def _emit(line):
+    """Print a line, or hold it in this thread's buffer while a parallel test runs"""
+    lines = getattr(_LOCAL, 'lines', None)
+    if lines is None:
+        print(line)
+    else:
+        lines.append(line)
+
+def parallel_safe(test):
+    """Mark a test as read-only and independent, so main() may run it concurrently"""
+    test._parallel = True
+    return test
+
+def _run_buffered(test):
+    """Run a test with its output captured; returns the lines for main() to print in order"""
+    _LOCAL.lines = []
+    try:
+        test()
+        return _LOCAL.lines
+    finally:
+        _LOCAL.lines = None
 
 def print_header(title):
     """Print a formatted test header"""
@@ -36,76 +93,109 @@ def print_header(title):
     print(f"{'='*60}")
 
 def print_test(test_name):
-    """Print test name"""
-    print(f"\n{test_name}")
-    print("-" * len(test_name))
+    """Print test name; the previous test's buffered output is flushed at this boundary"""
+    if getattr(_LOCAL, 'lines', None) is None:
+        sys.stdout.flush()
+    _emit(f"\n{test_name}")
+    _emit("-" * len(test_name))
+
+# Line prefix and TEST_RESULTS counter per status, built once instead of on every call
+_RESULT_PREFIXES = {"PASS": "   ✓ ", "FAIL": "   ✗ ", "WARN": "   ⚠ "}
+_RESULT_COUNTERS = {"PASS": 'passed', "FAIL": 'failed', "WARN": 'warnings'}
 
 def print_result(message, status="PASS"):
     """Print test result with status"""
-    symbols = {"PASS": "✓", "FAIL": "✗", "WARN": "⚠"}
-    symbol = symbols.get(status, "•")
-    print(f"   {symbol} {message}")
+    _emit(_RESULT_PREFIXES.get(status, "   • ") + message)
     
-    if status == "PASS":
-        TEST_RESULTS['passed'] += 1
-    elif status == "FAIL":
-        TEST_RESULTS['failed'] += 1
-    elif status == "WARN":
-        TEST_RESULTS['warnings'] += 1
+    counter = _RESULT_COUNTERS.get(status)
+    if counter:
+        with _RESULTS_LOCK:
+            TEST_RESULTS[counter] += 1
 
 def make_request(url, method="GET", data=None, timeout=10):
-    """Make HTTP request with error handling"""
+    """Make HTTP request with error handling over the shared keep-alive connection"""
+    path = url[len(API_BASE_URL):] if url.startswith(API_BASE_URL) else url
+    body = json.dumps(data).encode('utf-8') if data else None
+    headers = {'Content-Type': 'application/json'} if data else {}
+    
+    conn = _connection()
+    conn.timeout = timeout
+    if conn.sock is not None:
+        conn.sock.settimeout(timeout)
+    
     try:
-        if data:
-            data = json.dumps(data).encode('utf-8')
-            req = urllib.request.Request(url, data=data, method=method)
-            req.add_header('Content-Type', 'application/json')
-        else:
-            req = urllib.request.Request(url, method=method)
-        
-        with urllib.request.urlopen(req, timeout=timeout) as response:
-            content = response.read().decode('utf-8')
+        for attempt in range(2):
             try:
-                return response.status, json.loads(content)
-            except json.JSONDecodeError:
-                return response.status, content
-    except urllib.error.HTTPError as e:
-        return e.code, None
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                break
+            except (http.client.RemoteDisconnected, http.client.BadStatusLine, ConnectionResetError):
+                # The server dropped the idle keep-alive connection; reconnect and retry once
+                conn.close()
+                if attempt:
+                    raise
+        
+        # Every branch consumes the whole body so the connection can be reused
+        if response.status >= 400:
+            response.read()
+            return response.status, None
+        if response.headers.get_content_type() == 'application/json':
+            return response.status, json.load(response)
+        return response.status, response.read().decode('utf-8')
     except Exception as e:
+        conn.close()
         return None, str(e)
 
+_HEALTH_CACHE = {"ok": False, "ts": 0.0}
+
+def ensure_healthy(ttl=5.0):
+    """Return whether /health answered 200, re-probing only once the cached result is ttl seconds old"""
+    now = time.monotonic()
+    if now - _HEALTH_CACHE["ts"] >= ttl:
+        status, _ = make_request(f"{API_BASE_URL}/health", timeout=5)
+        _HEALTH_CACHE["ok"] = status == 200
+        _HEALTH_CACHE["ts"] = now
+    return _HEALTH_CACHE["ok"]
+
+_SHARED_DB = None
+
+def get_shared_db():
+    """One session for the whole run; init_db() runs once, on first use"""
+    global _SHARED_DB
+    if _SHARED_DB is None:
+        from db.models import init_db, SessionLocal
+        init_db()
+        _SHARED_DB = SessionLocal()
+    return _SHARED_DB
+
+def _wait_for_workers(expected, timeout=5.0, interval=0.05):
+    """Poll the worker status endpoint until num_workers == expected.
+    
+    Returns the last observed worker count (None if the endpoint never answered),
+    so callers can report what they saw when the deadline passes.
+    """
+    deadline = time.monotonic() + timeout
+    num_workers = None
+    while True:
+        status, data = make_request(f"{API_BASE_URL}/jobs/workers/status")
+        if status == 200 and isinstance(data, dict):
+            num_workers = data.get('worker_status', {}).get('num_workers', 0)
+            if num_workers == expected:
+                return num_workers
+        if time.monotonic() >= deadline:
+            return num_workers
+        time.sleep(interval)
+
 def test_01_module_imports():
     """Test 1: Verify all subtitle modules can be imported successfully"""
     print_test("Test 1: Module Imports")
     
-    try:
-        from utils.yt_dlp_helper import fetch_subtitle_text, is_transient_error
-        print_result("yt_dlp_helper module imported successfully")
-    except Exception as e:
-        print_result(f"yt_dlp_helper import failed: {e}", "FAIL")
-        return
-    
-    try:
-        from utils.subtitle_processor import SubtitleProcessor
-        print_result("subtitle_processor module imported successfully")
-    except Exception as e:
-        print_result(f"subtitle_processor import failed: {e}", "FAIL")
-        return
-    
-    try:
-        from workers.worker import WorkerManager, SubtitleWorker
-        print_result("worker module imported successfully")
-    except Exception as e:
-        print_result(f"worker module import failed: {e}", "FAIL")
-        return
-    
-    try:
-        from api.subtitles import router as subtitle_router
-        from api.jobs import router as jobs_router
-        print_result("API routers imported successfully")
-    except Exception as e:
-        print_result(f"API router import failed: {e}", "FAIL")
-        return
+    # The imports themselves ran once at module load; this only reports the outcome
+    for label, name in MODULES_UNDER_TEST:
+        if name in _IMPORT_ERRORS:
+            print_result(f"{label} import failed: {_IMPORT_ERRORS[name]}", "FAIL")
+            return
+        print_result(f"{label} imported successfully")
     
     print_result("All required modules imported successfully", "PASS")
 
@@ -114,33 +204,28 @@ def test_02_database_integration():
     print_test("Test 2: Database Integration")
     
     try:
-        from db.models import init_db, SessionLocal, Video, Channel, Subtitle
+        from db.models import Video, Channel, Subtitle
         
-        # Initialize database
-        init_db()
-        db = SessionLocal()
+        db = get_shared_db()
         
+        # Everything below runs in a SAVEPOINT that is rolled back, so no cleanup DELETEs
+        nested = db.begin_nested()
         try:
-            # Create test data with relationships
+            # Create test data with relationships; linking the objects lets the
+            # unit of work order all three INSERTs in a single flush
             channel = Channel(url='https://test-simple.com', name='Test Channel Simple')
-            db.add(channel)
-            db.flush()
-            
             video = Video(
-                channel_id=channel.id, 
+                channel=channel, 
                 url='https://test-simple.com/video', 
                 title='Test Video Simple'
             )
-            db.add(video)
-            db.flush()
-            
-            subtitle = Subtitle(
-                video_id=video.id, 
+            Subtitle(
+                video=video, 
                 language='en', 
                 content='Test subtitle content simple'
             )
-            db.add(subtitle)
-            db.commit()
+            db.add(channel)
+            db.flush()
             
             # Verify relationships work
             saved_subtitle = db.query(Subtitle).filter(Subtitle.video_id == video.id).first()
@@ -151,29 +236,25 @@ def test_02_database_integration():
             print_result("Database CRUD operations working correctly")
             print_result("SQLAlchemy relationships functioning properly")
             
-            # Clean up test data
-            db.delete(subtitle)
-            db.delete(video)
-            db.delete(channel)
-            db.commit()
-            print_result("Test data cleanup completed")
-            
         finally:
-            db.close()
+            # Clean up test data
+            nested.rollback()
+            db.rollback()
+        print_result("Test data cleanup completed")
             
     except Exception as e:
         print_result(f"Database integration test failed: {e}", "FAIL")
 
+@parallel_safe
 def test_03_api_server_health():
     """Test 3: Verify API server is running and healthy"""
     print_test("Test 3: API Server Health")
     
-    # Test health endpoint
-    status, data = make_request(f"{API_BASE_URL}/health")
-    if status == 200:
+    # Test health endpoint (reuses main()'s probe if it is still fresh)
+    if ensure_healthy():
         print_result("Health endpoint responding correctly")
     else:
-        print_result(f"Health endpoint failed: {status}", "FAIL")
+        print_result("Health endpoint failed", "FAIL")
         return
     
     # Test root endpoint
@@ -183,6 +264,7 @@ def test_03_api_server_health():
     else:
         print_result(f"Root endpoint failed: {status}", "FAIL")
 
+@parallel_safe
 def test_04_subtitle_api():
     """Test 4: Verify subtitle API endpoints"""
     print_test("Test 4: Subtitle API Endpoints")
@@ -203,6 +285,7 @@ def test_04_subtitle_api():
     else:
         print_result(f"Subtitle pagination failed: {status}", "WARN")
 
+@parallel_safe
 def test_05_video_api():
     """Test 5: Verify video management API endpoints"""
     print_test("Test 5: Video Management API")
@@ -240,13 +323,8 @@ def test_06_worker_management():
         print_result("Worker start endpoint working")
         
         # Wait for workers to initialize
-        time.sleep(2)
-        
-        # Check worker status after starting
-        status, data = make_request(f"{API_BASE_URL}/jobs/workers/status")
-        if status == 200 and isinstance(data, dict):
-            worker_status = data.get('worker_status', {})
-            active_workers = worker_status.get('num_workers', 0)
+        active_workers = _wait_for_workers(2)
+        if active_workers is not None:
             print_result(f"Workers started successfully - {active_workers} active")
         else:
             print_result("Worker status check after start failed", "WARN")
@@ -260,11 +338,8 @@ def test_06_worker_management():
         print_result("Worker stop endpoint working")
         
         # Verify workers stopped
-        time.sleep(1)
-        status, data = make_request(f"{API_BASE_URL}/jobs/workers/status")
-        if status == 200 and isinstance(data, dict):
-            worker_status = data.get('worker_status', {})
-            final_workers = worker_status.get('num_workers', 0)
+        final_workers = _wait_for_workers(0)
+        if final_workers is not None:
             if final_workers == 0:
                 print_result("All workers stopped successfully")
             else:
@@ -272,12 +347,13 @@ def test_06_worker_management():
     else:
         print_result(f"Worker stop failed: {status}", "FAIL")
 
+@parallel_safe
 def test_07_error_handling():
     """Test 7: Verify error handling and classification functions"""
     print_test("Test 7: Error Handling Functions")
     
     try:
-        from utils.yt_dlp_helper import is_transient_error
+        is_transient_error = _MODULES["utils.yt_dlp_helper"].is_transient_error
         
         # Test transient error detection
         transient_cases = [
@@ -294,15 +370,8 @@ def test_07_error_handling():
             "Video unavailable"
         ]
         
-        transient_correct = 0
-        for error_msg in transient_cases:
-            if is_transient_error(Exception(error_msg)):
-                transient_correct += 1
-        
-        permanent_correct = 0
-        for error_msg in permanent_cases:
-            if not is_transient_error(Exception(error_msg)):
-                permanent_correct += 1
+        transient_correct = sum(is_transient_error(Exception(msg)) for msg in transient_cases)
+        permanent_correct = sum(not is_transient_error(Exception(msg)) for msg in permanent_cases)
         
         print_result(f"Transient error detection: {transient_correct}/{len(transient_cases)} correct")
         print_result(f"Permanent error detection: {permanent_correct}/{len(permanent_cases)} correct")
@@ -320,10 +389,9 @@ def test_08_subtitle_processor():
     print_test("Test 8: Subtitle Processor")
     
     try:
-        from utils.subtitle_processor import SubtitleProcessor
-        from db.models import SessionLocal
+        SubtitleProcessor = _MODULES["utils.subtitle_processor"].SubtitleProcessor
         
-        db = SessionLocal()
+        db = get_shared_db()
         try:
             processor = SubtitleProcessor(db)
             print_result("SubtitleProcessor instantiated successfully")
@@ -342,11 +410,12 @@ def test_08_subtitle_processor():
                 print_result(f"Missing methods: {missing_methods}", "WARN")
                 
         finally:
-            db.close()
+            db.rollback()
             
     except Exception as e:
         print_result(f"Subtitle processor test failed: {e}", "FAIL")
 
+@parallel_safe
 def test_09_queue_statistics():
     """Test 9: Verify queue statistics endpoint (optional)"""
     print_test("Test 9: Queue Statistics")
@@ -400,27 +469,49 @@ def main():
     print("• Subtitle processing pipeline")
     
     # Check if server is running first
-    status, _ = make_request(f"{API_BASE_URL}/health", timeout=5)
-    if status != 200:
+    if not ensure_healthy():
         print_result("❌ Server is not running! Please start the FastAPI server first:", "FAIL")
         print(f"   cd video-subtitle-scraper/backend/src")
         print(f"   conda activate VSS")
         print(f"   uvicorn app:app --host 0.0.0.0 --port 8003 --reload")
         return
     
-    # Run all tests
-    test_01_module_imports()
-    test_02_database_integration()
-    test_03_api_server_health()
-    test_04_subtitle_api()
-    test_05_video_api()
-    test_06_worker_management()
-    test_07_error_handling()
-    test_08_subtitle_processor()
-    test_09_queue_statistics()
+    # Run all tests; with FAST_FAIL=1, stop once the imports or the database
+    # (tests 1-2) fail, since every later test depends on them
+    for test in (test_01_module_imports, test_02_database_integration):
+        failed_before = TEST_RESULTS['failed']
+        test()
+        if FAST_FAIL and TEST_RESULTS['failed'] > failed_before:
+            print_result("Stopping early: infrastructure check failed (FAST_FAIL=1)", "WARN")
+            break
+    else:
+        # Read-only tests run concurrently; their output is buffered and printed in order
+        remaining = [
+            test_03_api_server_health,
+            test_04_subtitle_api,
+            test_05_video_api,
+            test_06_worker_management,
+            test_07_error_handling,
+            test_08_subtitle_processor,
+            test_09_queue_statistics,
+        ]
+        parallel = [test for test in remaining if getattr(test, '_parallel', False)]
+        with ThreadPoolExecutor(max_workers=len(parallel)) as executor:
+            for lines in executor.map(_run_buffered, parallel):
+                print("\n".join(lines))
+        
+        # Tests that start/stop workers or use the shared session run one at a time
+        for test in remaining:
+            if not getattr(test, '_parallel', False):
+                test()
+    
+    if _SHARED_DB is not None:
+        _SHARED_DB.close()
     
     # Print final results
     print_final_results()
 
 if __name__ == "__main__":
+    # Block-buffer stdout; print_test() flushes once per test instead of once per line
+    sys.stdout.reconfigure(line_buffering=False)
     main()
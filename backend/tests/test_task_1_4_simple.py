@@ -7,13 +7,42 @@ Tests basic functionality without complex imports
 import os
 import sys
 import time
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 # Test configuration
 API_BASE_URL = "http://localhost:8003"
 
+# One keep-alive session for every call; all requests go to the same host
+SESSION = requests.Session()
+# Transient 5xx on the status/metrics reads are retried on the pooled connection; the
+# start/restart/stop POSTs change worker state, so they are never replayed
+SESSION.mount("http://", HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=8,
+    max_retries=Retry(total=2, backoff_factor=0.1, status_forcelist=[502, 503, 504], allowed_methods=["GET"])
+))
+SESSION.headers["Connection"] = "keep-alive"
+
+def poll_until(pred, timeout=2.0, interval=0.05):
+    """Call pred until it returns true or timeout seconds pass; return its last result"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if pred():
+            return True
+        time.sleep(interval)
+    return pred()
+
+def _worker_status():
+    """Current worker_status dict, or {} if the endpoint did not answer 200"""
+    response = SESSION.get(f"{API_BASE_URL}/jobs/workers/status")
+    return response.json()['worker_status'] if response.status_code == 200 else {}
+
 def test_parallel_scraping_api():
     """Test the parallel scraping API endpoints"""
     print("🚀 Testing Task 1-4 Parallel Scraping API")
@@ -22,7 +51,7 @@ def test_parallel_scraping_api():
     try:
         # Test 1: Get current worker status
         print("\n1. Testing worker status endpoint...")
-        response = requests.get(f"{API_BASE_URL}/jobs/workers/status")
+        response = SESSION.get(f"{API_BASE_URL}/jobs/workers/status")
         if response.status_code == 200:
             status = response.json()
             print(f"✅ Status endpoint working")
@@ -34,7 +63,7 @@ def test_parallel_scraping_api():
         
         # Test 2: Start workers
         print("\n2. Testing start workers endpoint...")
-        response = requests.post(f"{API_BASE_URL}/jobs/workers/start", json={"num_workers": 3})
+        response = SESSION.post(f"{API_BASE_URL}/jobs/workers/start", json={"num_workers": 3})
         if response.status_code == 200:
             result = response.json()
             print(f"✅ Start workers successful")
@@ -54,8 +83,15 @@ def test_parallel_scraping_api():
         
         # Test 3: Check status after starting
         print("\n3. Checking worker status after start...")
-        time.sleep(2)  # Brief pause
-        response = requests.get(f"{API_BASE_URL}/jobs/workers/status")
+        poll_until(lambda: _worker_status().get('num_workers', 0) >= 3)
+        
+        # Status (test 3) and performance metrics (test 4) are independent reads of the
+        # same post-start state; fetch them concurrently over the shared session
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            status_future = executor.submit(SESSION.get, f"{API_BASE_URL}/jobs/workers/status")
+            performance_future = executor.submit(SESSION.get, f"{API_BASE_URL}/jobs/workers/performance")
+        
+        response = status_future.result()
         if response.status_code == 200:
             status = response.json()
             worker_status = status['worker_status']
@@ -72,7 +108,7 @@ def test_parallel_scraping_api():
         
         # Test 4: Performance metrics
         print("\n4. Testing performance metrics...")
-        response = requests.get(f"{API_BASE_URL}/jobs/workers/performance")
+        response = performance_future.result()
         if response.status_code == 200:
             metrics = response.json()
             perf = metrics.get('performance_metrics', {})
@@ -89,19 +125,28 @@ def test_parallel_scraping_api():
         
         # Test 5: Let workers run for a bit
         print("\n5. Letting workers run for 10 seconds...")
-        for i in range(10):
-            time.sleep(1)
-            if i % 3 == 0:  # Check status every 3 seconds
-                response = requests.get(f"{API_BASE_URL}/jobs/workers/status")
-                if response.status_code == 200:
-                    status = response.json()
-                    total_processed = status['worker_status'].get('total_processed', 0)
-                    total_failed = status['worker_status'].get('total_failed', 0)
-                    print(f"   Progress: {total_processed} processed, {total_failed} failed")
+        # A background sampler checks status every 3 seconds; the main thread just waits out the window
+        stop_sampling = threading.Event()
+        samples = []
+        
+        def sample_progress():
+            while not stop_sampling.wait(3):
+                samples.append(_worker_status())
+        
+        sampler = threading.Thread(target=sample_progress, daemon=True)
+        sampler.start()
+        stop_sampling.wait(10)
+        stop_sampling.set()
+        sampler.join(timeout=1)
+        
+        for worker_status in samples:
+            total_processed = worker_status.get('total_processed', 0)
+            total_failed = worker_status.get('total_failed', 0)
+            print(f"   Progress: {total_processed} processed, {total_failed} failed")
         
         # Test 6: Queue statistics
         print("\n6. Checking queue statistics...")
-        response = requests.get(f"{API_BASE_URL}/jobs/queue/stats")
+        response = SESSION.get(f"{API_BASE_URL}/jobs/queue/stats")
         if response.status_code == 200:
             stats = response.json()
             print(f"✅ Queue statistics:")
@@ -115,15 +160,15 @@ def test_parallel_scraping_api():
         
         # Test 7: Restart workers
         print("\n7. Testing worker restart...")
-        response = requests.post(f"{API_BASE_URL}/jobs/workers/restart", json={"num_workers": 2})
+        response = SESSION.post(f"{API_BASE_URL}/jobs/workers/restart", json={"num_workers": 2})
         if response.status_code == 200:
             result = response.json()
             print(f"✅ Worker restart successful")
             print(f"   Message: {result.get('message', 'N/A')}")
             
             # Verify new worker count
-            time.sleep(1)
-            response = requests.get(f"{API_BASE_URL}/jobs/workers/status")
+            poll_until(lambda: _worker_status().get('num_workers', 0) == 2)
+            response = SESSION.get(f"{API_BASE_URL}/jobs/workers/status")
             if response.status_code == 200:
                 status = response.json()
                 new_count = status['worker_status'].get('num_workers', 0)
@@ -134,7 +179,7 @@ def test_parallel_scraping_api():
         # Test 8: Stop workers
         print("\n8. Testing graceful worker stop...")
         start_time = time.time()
-        response = requests.post(f"{API_BASE_URL}/jobs/workers/stop")
+        response = SESSION.post(f"{API_BASE_URL}/jobs/workers/stop")
         stop_time = time.time() - start_time
         
         if response.status_code == 200:
@@ -144,8 +189,8 @@ def test_parallel_scraping_api():
             print(f"   Reset videos: {result.get('reset_videos', 0)}")
             
             # Verify workers are stopped
-            time.sleep(1)
-            response = requests.get(f"{API_BASE_URL}/jobs/workers/status")
+            poll_until(lambda: not _worker_status().get('running', True))
+            response = SESSION.get(f"{API_BASE_URL}/jobs/workers/status")
             if response.status_code == 200:
                 status = response.json()
                 running = status['worker_status'].get('running', True)
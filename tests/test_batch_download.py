@@ -5,10 +5,23 @@ Tests both backend API endpoints and frontend integration
 """
 
 import requests
+import hashlib
+import io
 import json
 import sys
-from pathlib import Path
 import zipfile
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+FRONTEND_URL = "http://localhost:3000"
+MAX_ZIP_BYTES = 512 * 1024 * 1024  # stop reading a runaway download past this size
+
+# One keep-alive session for every request instead of a new connection per call
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+# The Next.js proxy can drop a request while it recompiles; retry it briefly
+SESSION.mount(FRONTEND_URL, HTTPAdapter(pool_connections=4, pool_maxsize=16,
+                                        max_retries=Retry(total=2, backoff_factor=0.1)))
 
 def test_batch_download_backend():
     """Test the backend batch download functionality"""
@@ -20,7 +33,7 @@ def test_batch_download_backend():
     # 1. Get list of channels
     print("1. Fetching channels...")
     try:
-        response = requests.get(f"{base_url}/channels/")
+        response = SESSION.get(f"{base_url}/channels/")
         response.raise_for_status()
         channels = response.json()
         print(f"   ✅ Found {len(channels)} channels")
@@ -47,13 +60,14 @@ def test_batch_download_backend():
     print(f"   Expected files: {completed_count}")
     
     try:
-        response = requests.get(f"{base_url}/channels/{channel_id}/subtitles/download")
+        response = SESSION.get(f"{base_url}/channels/{channel_id}/subtitles/download", stream=True)
         response.raise_for_status()
         
         # Check content type
         content_type = response.headers.get('content-type', '')
         if 'application/zip' not in content_type:
             print(f"   ❌ Unexpected content type: {content_type}")
+            response.close()
             return False
         
         print(f"   ✅ Got ZIP file response (Content-Type: {content_type})")
@@ -62,15 +76,23 @@ def test_batch_download_backend():
         content_disposition = response.headers.get('content-disposition', '')
         print(f"   ✅ Content-Disposition: {content_disposition}")
         
-        # Save and verify ZIP file
-        zip_path = Path("/tmp/test_batch_download_verification.zip")
-        with open(zip_path, 'wb') as f:
-            f.write(response.content)
+        # Read the ZIP into memory in 64 KiB chunks; zipfile needs a seekable file,
+        # so buffer the body here instead of round-tripping it through /tmp.
+        # The same pass hashes the bytes so a bad archive can be identified later.
+        zip_buffer = io.BytesIO()
+        digest = hashlib.sha256()
+        with response:
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                if zip_buffer.tell() + len(chunk) > MAX_ZIP_BYTES:
+                    print(f"   ❌ ZIP download exceeds {MAX_ZIP_BYTES} bytes, aborting")
+                    return False
+                digest.update(chunk)
+                zip_buffer.write(chunk)
         
-        print(f"   ✅ Downloaded ZIP file: {zip_path} ({len(response.content)} bytes)")
+        print(f"   ✅ Downloaded ZIP file ({zip_buffer.tell()} bytes, sha256 {digest.hexdigest()})")
         
         # Verify ZIP contents
-        with zipfile.ZipFile(zip_path, 'r') as zip_file:
+        with zipfile.ZipFile(zip_buffer, 'r') as zip_file:
             file_list = zip_file.namelist()
             print(f"   ✅ ZIP contains {len(file_list)} files:")
             for filename in file_list:
@@ -82,9 +104,6 @@ def test_batch_download_backend():
             else:
                 print(f"   ⚠️  File count less than expected ({len(file_list)} < {completed_count})")
         
-        # Cleanup
-        zip_path.unlink()
-        
     except Exception as e:
         print(f"   ❌ Failed to download batch: {e}")
         return False
@@ -92,7 +111,7 @@ def test_batch_download_backend():
     # 3. Test with non-existent channel
     print(f"\n3. Testing with non-existent channel...")
     try:
-        response = requests.get(f"{base_url}/channels/99999/subtitles/download")
+        response = SESSION.get(f"{base_url}/channels/99999/subtitles/download")
         if response.status_code == 404:
             print("   ✅ Correctly returned 404 for non-existent channel")
         else:
@@ -110,22 +129,22 @@ def test_frontend_endpoints():
     print("\n🌐 Testing Frontend API Routing")
     print("=" * 50)
     
-    frontend_url = "http://localhost:3000"
+    frontend_url = FRONTEND_URL
     
     try:
         # Test if frontend is running
-        response = requests.get(frontend_url, timeout=5)
+        response = SESSION.get(frontend_url, timeout=5)
         print(f"   ✅ Frontend is running at {frontend_url}")
         
         # Test API proxy routing
-        response = requests.get(f"{frontend_url}/api/channels/", timeout=10)
+        response = SESSION.get(f"{frontend_url}/api/channels/", timeout=10)
         response.raise_for_status()
         channels = response.json()
         print(f"   ✅ API proxy working - fetched {len(channels)} channels through frontend")
         
         return True
         
-    except requests.exceptions.ConnectError:
+    except requests.exceptions.ConnectionError:
         print(f"   ⚠️  Frontend not running at {frontend_url}")
         return False
     except Exception as e:
@@ -137,11 +156,14 @@ def main():
     print("🚀 Task 1-6 UI Batch Download - Comprehensive Test")
     print("=" * 60)
     
-    # Test backend
-    backend_success = test_batch_download_backend()
-    
-    # Test frontend
-    frontend_success = test_frontend_endpoints()
+    try:
+        # Test backend
+        backend_success = test_batch_download_backend()
+        
+        # Test frontend
+        frontend_success = test_frontend_endpoints()
+    finally:
+        SESSION.close()
     
     # Summary
     print("\n📊 TEST SUMMARY")
@@ -9,11 +9,11 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend', 'src'))
 
 from sqlalchemy.orm import Session
-from db.models import SessionLocal, Video, Log, Setting, init_db
+from db.models import ScopedSession, Video, Log, Setting, init_db
 from utils.error_handler import (
     log, log_exception, startup_recovery, 
     handle_worker_exception, TransientError, PermanentError,
-    classify_yt_dlp_error, reset_retry_attempts
+    classify_yt_dlp_error, reset_retry_attempts, flush_logs
 )
 import traceback
 
@@ -53,33 +53,28 @@ def test_error_classification():
     """Test yt-dlp error classification"""
     print("\n=== Testing Error Classification ===")
     
-    # Test permanent errors
-    permanent_errors = [
-        "No native subtitles available",
-        "Video unavailable",
-        "Private video",
-        "Age restricted content"
+    cases = [
+        # Permanent errors
+        ("No native subtitles available", PermanentError),
+        ("Video unavailable", PermanentError),
+        ("Private video", PermanentError),
+        ("Age restricted content", PermanentError),
+        
+        # Transient errors
+        ("Connection timeout", TransientError),
+        ("Rate limit exceeded", TransientError),
+        ("Service unavailable", TransientError),
+        ("502 Bad Gateway", TransientError),
     ]
     
-    for error in permanent_errors:
-        error_class = classify_yt_dlp_error(error)
-        expected = PermanentError
-        result = "✅" if error_class == expected else "❌"
-        print(f"{result} '{error}' -> {error_class.__name__}")
-    
-    # Test transient errors
-    transient_errors = [
-        "Connection timeout",
-        "Rate limit exceeded",
-        "Service unavailable",
-        "502 Bad Gateway"
+    # Report only the misclassified messages
+    mismatches = [
+        (error, expected, actual) for error, expected in cases
+        if (actual := classify_yt_dlp_error(error)) is not expected
     ]
-    
-    for error in transient_errors:
-        error_class = classify_yt_dlp_error(error)
-        expected = TransientError
-        result = "✅" if error_class == expected else "❌"
-        print(f"{result} '{error}' -> {error_class.__name__}")
+    for error, expected, actual in mismatches:
+        print(f"❌ '{error}' -> {actual.__name__} (expected {expected.__name__})")
+    print(f"Classified {len(cases)} messages, {len(mismatches)} mismatches")
     
     print("✅ Error classification tests completed")
 
@@ -110,11 +105,13 @@ def test_worker_exception_handling():
     
     print("✅ Worker exception handling tests completed")
 
-def test_startup_recovery():
+def test_startup_recovery(db: Session = None):
     """Test startup recovery functionality"""
     print("\n=== Testing Startup Recovery ===")
     
-    db = SessionLocal()
+    owns_session = db is None
+    if owns_session:
+        db = ScopedSession()
     try:
         # Create some test videos in different states
         test_videos = [
@@ -123,8 +120,8 @@ def test_startup_recovery():
             Video(url="https://test3.com", title="Test 3", status="completed", attempts=0),
         ]
         
-        for video in test_videos:
-            db.add(video)
+        # One executemany; the objects aren't used afterwards, so skip the identity map
+        db.bulk_save_objects(test_videos)
         db.commit()
         
         print(f"Created {len(test_videos)} test videos")
@@ -147,15 +144,18 @@ def test_startup_recovery():
         traceback.print_exc()
     finally:
         # Cleanup test data
-        db.query(Video).filter(Video.url.like("https://test%")).delete()
+        db.query(Video).filter(Video.url.like("https://test%")).delete(synchronize_session=False)
         db.commit()
-        db.close()
+        if owns_session:
+            ScopedSession.remove()
 
-def test_log_retrieval():
+def test_log_retrieval(db: Session = None):
     """Test log retrieval functionality"""
     print("\n=== Testing Log Retrieval ===")
     
-    db = SessionLocal()
+    owns_session = db is None
+    if owns_session:
+        db = ScopedSession()
     try:
         # Get recent logs
         from utils.error_handler import get_recent_errors
@@ -168,23 +168,28 @@ def test_log_retrieval():
     except Exception as e:
         print(f"❌ Log retrieval test failed: {e}")
     finally:
-        db.close()
+        if owns_session:
+            ScopedSession.remove()
 
-def test_database_integration():
+def test_database_integration(db: Session = None):
     """Test database integration and logging fallback"""
     print("\n=== Testing Database Integration ===")
     
     # Test that logs are actually saved to database
-    db = SessionLocal()
+    owns_session = db is None
+    if owns_session:
+        db = ScopedSession()
     try:
-        # Count logs before
+        # Count logs before (earlier tests may still have entries queued)
+        flush_logs()
         log_count_before = db.query(Log).count()
         
         # Add some test logs
         log('INFO', 'Test database integration log 1')
         log('ERROR', 'Test database integration log 2', video_id=999)
         
-        # Count logs after
+        # Count logs after the queued writes land
+        flush_logs()
         log_count_after = db.query(Log).count()
         
         logs_added = log_count_after - log_count_before
@@ -198,13 +203,16 @@ def test_database_integration():
     except Exception as e:
         print(f"❌ Database integration test failed: {e}")
     finally:
-        db.close()
+        if owns_session:
+            ScopedSession.remove()
 
 def main():
     """Run all error handling tests"""
     print("Error Handling Test Suite (Task 1-7)")
     print("=" * 50)
     
+    # The database tests share this thread's session (one pool checkout) for the whole run
+    db = ScopedSession()
     try:
         # Initialize database
         init_db()
@@ -214,9 +222,9 @@ def main():
         test_exception_logging()
         test_error_classification()
         test_worker_exception_handling()
-        test_startup_recovery()
-        test_log_retrieval()
-        test_database_integration()
+        test_startup_recovery(db)
+        test_log_retrieval(db)
+        test_database_integration(db)
         
         print("\n" + "=" * 50)
         print("✅ All error handling tests completed successfully!")
@@ -226,6 +234,9 @@ def main():
         print(f"\n❌ Test suite failed: {e}")
         traceback.print_exc()
         return 1
+    finally:
+        db.rollback()
+        ScopedSession.remove()
     
     return 0
 
@@ -2,58 +2,104 @@
 """
 Test script for VideoQueue API functionality
 """
+import os
+import sys
 import requests
 import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 BASE_URL = "http://localhost:8000/api"
 
+# Endpoint URLs, built once
+CHANNELS_URL = f"{BASE_URL}/channels/"
+CHANNEL_VIDEOS_URL = BASE_URL + "/channels/{id}/videos"
+VIDEO_RETRY_URL = BASE_URL + "/videos/{id}/retry"
+VIDEOS_RETRY_URL = f"{BASE_URL}/videos/retry"
+
+# VERBOSE=0 skips the per-channel and per-video listings
+VERBOSE = os.getenv("VERBOSE", "1") != "0"
+
+# One keep-alive session for every call instead of a new connection per request
+SESSION = requests.Session()
+SESSION.headers.update({"Accept": "application/json"})
+# Reads retry transient gateway errors and dropped connections with a short backoff; the
+# retry POST is left out since re-sending it after a lost response would re-queue twice
+SESSION.mount("http://", HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=10,
+    max_retries=Retry(total=3, backoff_factor=0.1, status_forcelist=(502, 503, 504),
+                      allowed_methods=frozenset(["GET"]))
+))
+
+def response_ok(response):
+    """Print the status; on an HTTP error also print the body and return False"""
+    print(f"Status: {response.status_code}")
+    try:
+        response.raise_for_status()
+    except requests.HTTPError:
+        print(f"Error: {response.text}")
+        return False
+    return True
+
 def test_channels_list():
     """Test listing all channels"""
     print("=== Testing Channels List ===")
-    response = requests.get(f"{BASE_URL}/channels/")
-    print(f"Status: {response.status_code}")
-    if response.status_code == 200:
-        channels = response.json()
-        print(f"Found {len(channels)} channels:")
-        for channel in channels:
-            print(f"  - ID: {channel['id']}, Name: {channel['name']}, Total Videos: {channel['total_videos']}")
-            print(f"    Status: Pending({channel['pending']}), Completed({channel['completed']}), Failed({channel['failed']})")
-        return channels
-    else:
-        print(f"Error: {response.text}")
+    response = SESSION.get(CHANNELS_URL)
+    if not response_ok(response):
         return []
+    
+    channels = response.json()
+    print(f"Found {len(channels)} channels:")
+    if VERBOSE:
+        # Build the listing and write it once instead of two print calls per channel
+        lines = []
+        for channel in channels:
+            lines.append(f"  - ID: {channel['id']}, Name: {channel['name']}, Total Videos: {channel['total_videos']}")
+            lines.append(f"    Status: Pending({channel['pending']}), Completed({channel['completed']}), Failed({channel['failed']})")
+        if lines:
+            sys.stdout.write("\n".join(lines) + "\n")
+    return channels
 
 def test_channel_videos(channel_id):
     """Test getting videos for a specific channel"""
     print(f"\n=== Testing Channel {channel_id} Videos ===")
-    response = requests.get(f"{BASE_URL}/channels/{channel_id}/videos")
-    print(f"Status: {response.status_code}")
-    if response.status_code == 200:
-        data = response.json()
-        videos = data['videos']
-        print(f"Found {len(videos)} videos:")
+    response = SESSION.get(CHANNEL_VIDEOS_URL.format(id=channel_id))
+    if not response_ok(response):
+        return []
+    
+    videos = response.json()['videos']
+    print(f"Found {len(videos)} videos:")
+    if VERBOSE:
+        lines = []
         for video in videos:
-            print(f"  - ID: {video['id']}, Title: {video['title'][:50]}...")
-            print(f"    Status: {video['status']}, Attempts: {video['attempts']}")
+            lines.append(f"  - ID: {video['id']}, Title: {video['title'][:50]}...")
+            lines.append(f"    Status: {video['status']}, Attempts: {video['attempts']}")
             if video['last_error']:
-                print(f"    Error: {video['last_error'][:50]}...")
-        return videos
-    else:
-        print(f"Error: {response.text}")
-        return []
+                lines.append(f"    Error: {video['last_error'][:50]}...")
+        if lines:
+            sys.stdout.write("\n".join(lines) + "\n")
+    return videos
 
 def test_video_retry(video_id):
     """Test retrying a failed video"""
     print(f"\n=== Testing Video {video_id} Retry ===")
-    response = requests.post(f"{BASE_URL}/videos/{video_id}/retry")
-    print(f"Status: {response.status_code}")
-    if response.status_code == 200:
-        result = response.json()
-        print(f"Retry result: {result}")
-        return True
-    else:
-        print(f"Error: {response.text}")
+    response = SESSION.post(VIDEO_RETRY_URL.format(id=video_id))
+    if not response_ok(response):
         return False
+    
+    print(f"Retry result: {response.json()}")
+    return True
+
+def check_videos_retry_batch(video_ids):
+    """Test retrying several failed videos in one request"""
+    print(f"\n=== Testing Batch Retry of {len(video_ids)} Videos ===")
+    response = SESSION.post(VIDEOS_RETRY_URL, json={"ids": video_ids})
+    if not response_ok(response):
+        return False
+    
+    print(f"Retry result: {response.json()}")
+    return True
 
 def main():
     print("VideoQueue API Test Suite")
@@ -80,17 +126,19 @@ def main():
         # Test 3: Find a failed video and try to retry it
         failed_videos = [v for v in videos if v['status'] == 'failed']
         if failed_videos:
-            video_to_retry = failed_videos[0]
-            print(f"\nFound failed video: {video_to_retry['title']}")
-            test_video_retry(video_to_retry['id'])
+            print(f"\nFound {len(failed_videos)} failed videos, first: {failed_videos[0]['title']}")
+            test_video_retry(failed_videos[0]['id'])
+            if len(failed_videos) > 1:
+                check_videos_retry_batch([v['id'] for v in failed_videos[1:]])
         else:
             print("\nNo failed videos found to test retry functionality")
     
     print("\n=== Test Summary ===")
     print("✅ Channels list endpoint working")
     print("✅ Channel videos endpoint working")
-    print("✅ Video retry endpoint working" if failed_videos else "⚠️  No failed videos to test retry")
+    print("✅ Video retry endpoints working" if failed_videos else "⚠️  No failed videos to test retry")
     print("\nVideoQueue component should work correctly with the backend!")
 
 if __name__ == "__main__":
-    main()
+    with SESSION:
+        main()